@@ -0,0 +1,201 @@
+"""
+Headless batch solver for sliding puzzles, no kivy involved
+Reads one puzzle per line from a JSONL file, for instance
+    {"id": "level-1", "height": 4, "width": 4, "grid": [[4, 1, 2, 3], [0, 5, 6, 7], ...]}
+solves them over a process pool and writes one result per line as soon as it is ready
+    {"id": "level-1", "solution": "u", "length": 1, "optimal": true, "time": 0.0001}
+with --optimize, solutions go through the post-optimizer and "raw_length" is added
+a line that is not a JSON object becomes an error record and the batch goes on
+    {"line": 7, "error": "JSONDecodeError: Expecting value: line 1 column 1 (char 0)"}
+and so does a record that cannot be solved, whatever the reason
+    {"id": "level-2", "error": "ValueError: 0 is not in list"}
+
+Usage: python batch.py solve puzzles.jsonl solutions.jsonl --mode optimal --workers 8
+       python batch.py generate puzzles.jsonl --count 1000000 --height 4 --width 4 --seed 1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import ida_star
+from optimize import optimize_moves
+from puzzle import PackedPuzzle, random_grid
+
+
+def read_instances(stream):
+    """
+    Lazily parse puzzle records, blank lines are skipped
+    Records without an id are numbered by their line in the file, a line that cannot
+    be parsed into an object gives an error record {'line': number, 'error': message}
+    Yields dictionaries
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield {'line': line_number, 'error': '{}: {}'.format(type(error).__name__, error)}
+            continue
+        if not isinstance(record, dict):
+            yield {'line': line_number, 'error': 'TypeError: expected a JSON object, got ' + type(record).__name__}
+            continue
+        record.setdefault('id', line_number)
+        yield record
+
+
+def chunked(records, size):
+    """
+    Group an iterable into lists of at most size items without reading ahead
+    Yields lists
+    """
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def solve_instance(record, mode="scripted", max_nodes=None, window=None):
+    """
+    Solve a single puzzle record
+    In optimal mode, a search that runs out of nodes falls back to the scripted solver
+    If window is not None, the solution is post-optimized with that window length
+    Returns a result dictionary, with an error message if the puzzle cannot be solved
+    """
+    if 'error' in record:  # the line could not be read, see read_instances
+        return record
+    start = time.perf_counter()
+    try:
+        puzzle = PackedPuzzle(record['height'], record['width'], record['grid'])
+        initial = puzzle.clone()
+        optimal = False
+        if mode == "optimal":
+            try:
+                solution = puzzle.solve_optimal(max_nodes)
+                optimal = True
+            except ida_star.SearchLimitExceeded:
+                solution = puzzle.solve_puzzle()
+        else:
+            solution = puzzle.solve_puzzle(mode)
+        if window is not None:
+            raw_length = len(solution)
+            solution = optimize_moves(initial, solution, window).moves
+    except Exception as error:  # a malformed record fails alone, the batch goes on
+        return {'id': record['id'], 'error': '{}: {}'.format(type(error).__name__, error)}
+
+    result = {'id': record['id'],
+              'solution': solution,
+              'length': len(solution),
+              'optimal': optimal,
+              'time': round(time.perf_counter() - start, 6)}
+    if window is not None:
+        result['raw_length'] = raw_length
+    return result
+
+
+def solve_chunk(chunk, mode, max_nodes, window):
+    """
+    Worker entry point, solves a chunk of records in one task to amortize the IPC cost
+    Returns a list of result dictionaries
+    """
+    return [solve_instance(record, mode, max_nodes, window) for record in chunk]
+
+
+def run(source, target, mode="scripted", max_nodes=None, workers=None, chunksize=16, window=None):
+    """
+    Stream records from source to results in target
+    At most two chunks per worker are in flight, so memory stays bounded however large the input is
+    Results are written in completion order, not in input order
+    Returns the number of records processed
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 0
+
+    def flush(futures):
+        nonlocal count
+        for future in futures:
+            for result in future.result():
+                target.write(json.dumps(result) + '\n')
+                count += 1
+        target.flush()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunked(read_instances(source), chunksize):
+            pending.add(pool.submit(solve_chunk, chunk, mode, max_nodes, window))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                flush(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            flush(done)
+
+    return count
+
+
+def generate(target, count, height, width, seed=None):
+    """
+    Write count uniformly random solvable puzzles as puzzle records
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        record = {'id': index + 1, 'height': height, 'width': width,
+                  'grid': random_grid(height, width, rng)}
+        target.write(json.dumps(record) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve or generate sliding puzzles as JSONL.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    solve = commands.add_parser('solve', help="solve puzzle records")
+    solve.add_argument('input', help="puzzle records, one JSON object per line ('-' for stdin)")
+    solve.add_argument('output', help="result records, one JSON object per line ('-' for stdout)")
+    solve.add_argument('--mode', choices=('scripted', 'optimal'), default='scripted')
+    solve.add_argument('--max-nodes', type=int, default=None,
+                       help="search budget per puzzle in optimal mode before falling back")
+    solve.add_argument('--workers', type=int, default=None, help="number of processes")
+    solve.add_argument('--chunksize', type=int, default=16, help="puzzles per task")
+    solve.add_argument('--optimize', type=int, default=None, metavar='WINDOW',
+                       help="post-optimize solutions, re-solving sub-paths of this length (0: cancel pairs only)")
+
+    make = commands.add_parser('generate', help="generate random solvable puzzle records")
+    make.add_argument('output', help="puzzle records, one JSON object per line ('-' for stdout)")
+    make.add_argument('--count', type=int, default=1000)
+    make.add_argument('--height', type=int, default=4)
+    make.add_argument('--width', type=int, default=4)
+    make.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    source = None
+    if args.command == 'solve':
+        source = sys.stdin if args.input == '-' else open(args.input)
+    target = sys.stdout if args.output == '-' else open(args.output, 'w')
+    start = time.perf_counter()
+    try:
+        if args.command == 'solve':
+            count = run(source, target, args.mode, args.max_nodes, args.workers, args.chunksize,
+                        args.optimize)
+            verb = "solved"
+        else:
+            generate(target, args.count, args.height, args.width, args.seed)
+            count, verb = args.count, "generated"
+    finally:
+        if source not in (None, sys.stdin):
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    print("{} {} puzzles in {:.2f} seconds".format(verb, count, time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
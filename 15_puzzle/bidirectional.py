@@ -0,0 +1,200 @@
+"""
+Exact bidirectional breadth-first solver for small sliding puzzles (up to 15 cells)
+Every state is a single integer: 4 bits per cell (the same layout as PackedPuzzle)
+plus the blank position in the top bits, so a move is a couple of integer operations.
+Visited states live in open-addressing hash tables over array('Q') keys and a
+bytearray of values, which costs about 18 bytes per state instead of the hundreds
+a Python dict of tuples needs, so the 3x4 board stays within a few hundred MB.
+"""
+
+from array import array
+
+import ida_star
+
+DIRECTIONS = 'udlr'
+BITS = 4
+MASK64 = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15  # Fibonacci hashing multiplier
+
+
+class IntTable:
+    """
+    Open-addressing hash table from non-zero 64-bit integers to bytes
+    Linear probing, the capacity doubles whenever the table is half full
+    """
+
+    def __init__(self, capacity_bits=16):
+        self._bits = capacity_bits
+        self._keys = array('Q', bytes(8 << capacity_bits))
+        self._values = bytearray(1 << capacity_bits)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _slot(self, key):
+        """
+        Find the slot holding key, or the empty slot where it would go
+        Returns an integer
+        """
+        keys = self._keys
+        mask = len(keys) - 1
+        slot = ((key * GOLDEN) & MASK64) >> (64 - self._bits)
+        while True:
+            found = keys[slot]
+            if found == key or found == 0:
+                return slot
+            slot = (slot + 1) & mask
+
+    def get(self, key, default=None):
+        slot = self._slot(key)
+        return self._values[slot] if self._keys[slot] else default
+
+    def add(self, key, value):
+        """
+        Insert key unless it is already present
+        Returns True if the key was inserted
+        """
+        slot = self._slot(key)
+        if self._keys[slot]:
+            return False
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._size += 1
+        if 2 * self._size > len(self._keys):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old_keys, old_values = self._keys, self._values
+        self._bits += 1
+        self._keys = array('Q', bytes(8 << self._bits))
+        self._values = bytearray(1 << self._bits)
+        for slot, key in enumerate(old_keys):
+            if key:
+                new_slot = self._slot(key)
+                self._keys[new_slot] = key
+                self._values[new_slot] = old_values[slot]
+
+    def nbytes(self):
+        """
+        Memory held by the table
+        """
+        return self._keys.itemsize * len(self._keys) + len(self._values)
+
+
+def encode(tiles):
+    """
+    Pack a flat tile list and its blank position into one integer
+    Returns an integer
+    """
+    state = 0
+    for pos, tile in enumerate(tiles):
+        state |= tile << (BITS * pos)
+    return state | (list(tiles).index(0) << (BITS * len(tiles)))
+
+
+def decode(key, cells):
+    """
+    Unpack an integer made by encode
+    Returns a list of tiles
+    """
+    return [(key >> (BITS * pos)) & 15 for pos in range(cells)]
+
+
+def solve(tiles, height, width, max_nodes=None):
+    """
+    Search from both the start and the solved state, always growing the smaller frontier
+    The tiles must be solvable and fit in 15 cells
+    Raises ida_star.SearchLimitExceeded after expanding more than max_nodes states
+    Returns a shortest move string
+    """
+    cells = height * width
+    assert cells <= 15, "board too large for the bidirectional solver"
+
+    start = encode(tiles)
+    goal = encode(range(cells))
+    if start == goal:
+        return ''
+
+    # (direction index, target, blank shift, target shift) of every move from every blank position
+    blank_shift = BITS * cells
+    state_mask = (1 << blank_shift) - 1
+    moves = [[(DIRECTIONS.index(direction), target, BITS * blank, BITS * target)
+              for direction, target in options]
+             for blank, options in enumerate(ida_star.neighbor_table(height, width))]
+
+    # value byte: depth in the high 6 bits, index of the move that reached the state in the low 2 bits
+    tables = (IntTable(), IntTable())
+    tables[0].add(start, 0)
+    tables[1].add(goal, 0)
+    frontiers = (array('Q', [start]), array('Q', [goal]))
+    depths = [0, 0]
+    expanded = 0
+
+    while True:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        table, other = tables[side], tables[1 - side]
+        depth = depths[side] + 1
+        assert depth < 64, "search too deep for the value encoding"
+        layer = array('Q')
+        best, meet = None, None
+
+        for key in frontiers[side]:
+            expanded += 1
+            if max_nodes is not None and expanded > max_nodes:
+                raise ida_star.SearchLimitExceeded(expanded)
+            blank = key >> blank_shift
+            state = key & state_mask
+            for index, target, shift, target_shift in moves[blank]:
+                tile = (state >> target_shift) & 15
+                child = state ^ (tile << shift) ^ (tile << target_shift) | (target << blank_shift)
+                if not table.add(child, depth << 2 | index):
+                    continue
+                layer.append(child)
+                found = other.get(child)
+                if found is not None and (best is None or found >> 2 < best):
+                    best, meet = found >> 2, child
+
+        frontiers[side][:] = layer
+        depths[side] = depth
+        if meet is not None:
+            return _path(tables, meet, moves, blank_shift)
+        assert len(layer), "no solution exists"
+
+
+def _path(tables, meet, moves, blank_shift):
+    """
+    Walk from the meeting state back to both roots
+    Returns a string
+    """
+    halves = []
+    for table in tables:
+        path = []
+        key = meet
+        value = table.get(key)
+        while value >> 2:
+            direction = DIRECTIONS[value & 3]
+            path.append(direction)
+            key = _step(key, ida_star.INVERSE[direction], moves, blank_shift)
+            value = table.get(key)
+        halves.append(path)
+
+    # the start half was recorded forwards, the goal half has to be undone
+    head = ''.join(reversed(halves[0]))
+    tail = ''.join(ida_star.INVERSE[direction] for direction in halves[1])
+    return head + tail
+
+
+def _step(key, direction, moves, blank_shift):
+    """
+    Apply a single blank move to an encoded state
+    Returns an integer
+    """
+    blank = key >> blank_shift
+    state = key & ((1 << blank_shift) - 1)
+    for index, target, shift, target_shift in moves[blank]:
+        if DIRECTIONS[index] == direction:
+            tile = (state >> target_shift) & 15
+            return state ^ (tile << shift) ^ (tile << target_shift) | (target << blank_shift)
+    assert False, "move off grid: " + direction
@@ -0,0 +1,196 @@
+"""
+Complete distance table for the 3x3 board (the 8-puzzle)
+Only half of the 9! permutations are reachable, a solvable board is identified by
+the blank position and the rank of the other eight tiles, halved because the
+parity of those eight tiles is fixed. The table holds the optimal number of moves
+of every one of the 181,440 states in as many bytes, so solving is a greedy walk
+towards the neighbour one move closer to the goal.
+
+The table is built once by breadth-first search and memory-mapped on load
+
+Usage: python eight_puzzle.py [FILE]
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import deque
+
+import ida_star
+
+MAGIC = b'8PDT'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')  # magic, version, number of states
+HEIGHT = WIDTH = 3
+CELLS = HEIGHT * WIDTH
+STATES = 181440  # 9! / 2
+UNSEEN = 255
+
+NEIGHBORS = ida_star.neighbor_table(HEIGHT, WIDTH)
+
+_loaded = {}
+
+
+def default_path():
+    """
+    Location of the default table file
+    Returns a string
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eight_puzzle.bin')
+
+
+def rank(permutation):
+    """
+    Lexicographic index of a permutation of range(n) (its Lehmer code)
+    Returns an integer in range(n!)
+    """
+    index = 0
+    n = len(permutation)
+    for i, value in enumerate(permutation):
+        smaller = 0
+        for j in range(i + 1, n):
+            if permutation[j] < value:
+                smaller += 1
+        index = index * (n - i) + smaller
+    return index
+
+
+def unrank(index, n):
+    """
+    Inverse of rank
+    Returns a list, the permutation of range(n) at the given lexicographic index
+    """
+    digits = []
+    for radix in range(1, n + 1):
+        index, digit = divmod(index, radix)
+        digits.append(digit)
+    remaining = list(range(n))
+    return [remaining.pop(digit) for digit in reversed(digits)]
+
+
+def state_index(tiles):
+    """
+    Dense index of a solvable 3x3 board given as a flat tile list
+    Returns an integer in range(STATES)
+    """
+    blank = tiles.index(0)
+    others = [tile - 1 for tile in tiles if tile]
+    return blank * (STATES // CELLS) + rank(others) // 2
+
+
+def state_tiles(index):
+    """
+    Inverse of state_index
+    Returns a flat tile list
+    """
+    blank, half = divmod(index, STATES // CELLS)
+    others = unrank(2 * half, CELLS - 1)
+    # ranks 2k and 2k + 1 only differ by the order of the last two tiles, pick the solvable one
+    inversions = sum(1 for i in range(len(others))
+                     for j in range(i + 1, len(others)) if others[i] > others[j])
+    if inversions % 2:
+        others[-2], others[-1] = others[-1], others[-2]
+    tiles = [tile + 1 for tile in others]
+    tiles.insert(blank, 0)
+    return tiles
+
+
+def build_table(verbose=False):
+    """
+    Breadth-first search backwards from the solved board
+    Returns a bytearray indexed by state_index
+    """
+    table = bytearray([UNSEEN]) * STATES
+    goal = list(range(CELLS))
+    table[state_index(goal)] = 0
+    queue = deque([(goal, 0)])
+    while queue:
+        tiles, blank = queue.popleft()
+        depth = table[state_index(tiles)] + 1
+        for dummy_direction, target in NEIGHBORS[blank]:
+            child = tiles[:]
+            child[blank], child[target] = child[target], 0
+            index = state_index(child)
+            if table[index] == UNSEEN:
+                table[index] = depth
+                queue.append((child, target))
+    assert UNSEEN not in table, "some states were not reached"
+    if verbose:
+        print("{} states, at most {} moves".format(STATES, max(table)))
+    return table
+
+
+def save(table, path):
+    """
+    Write a table to a file, see load
+    """
+    with open(path, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, VERSION, len(table)))
+        handle.write(table)
+
+
+def load(path):
+    """
+    Memory-map a table file
+    Returns a read-only memoryview indexed by state_index
+    """
+    with open(path, 'rb') as handle:
+        data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, size = HEADER.unpack_from(data, 0)
+    assert magic == MAGIC, "not an 8-puzzle table: " + path
+    assert version == VERSION, "unsupported 8-puzzle table version: " + str(version)
+    assert size == STATES and len(data) == HEADER.size + size, "truncated 8-puzzle table: " + path
+    return memoryview(data)[HEADER.size:]
+
+
+def load_default():
+    """
+    Load the default table once per process
+    Returns a memoryview, or None if the file has not been built
+    """
+    if 'table' not in _loaded:
+        path = default_path()
+        _loaded['table'] = load(path) if os.path.exists(path) else None
+    return _loaded['table']
+
+
+def distance(tiles, table):
+    """
+    Optimal number of moves of a solvable 3x3 board
+    Returns an integer
+    """
+    return table[state_index(list(tiles))]
+
+
+def solve(tiles, table):
+    """
+    Walk the table greedily, every step moves to a neighbour one move closer to the goal
+    The tiles must be a solvable 3x3 board
+    Returns a shortest move string
+    """
+    tiles = list(tiles)
+    blank = tiles.index(0)
+    remaining = table[state_index(tiles)]
+    moves = []
+    while remaining:
+        for direction, target in NEIGHBORS[blank]:
+            tiles[blank], tiles[target] = tiles[target], 0
+            if table[state_index(tiles)] < remaining:
+                moves.append(direction)
+                blank = target
+                remaining -= 1
+                break
+            tiles[target], tiles[blank] = tiles[blank], 0
+        else:
+            assert False, "inconsistent 8-puzzle table"
+    return ''.join(moves)
+
+
+if __name__ == '__main__':
+    output = sys.argv[1] if len(sys.argv) > 1 else default_path()
+    start = time.time()
+    save(build_table(verbose=True), output)
+    print("saved to {} in {:.1f} seconds".format(output, time.time() - start))
@@ -0,0 +1,210 @@
+"""
+Optimal solver for the sliding puzzle - iterative-deepening A* (IDA*)
+The board is a flat bytearray indexed by row * width + col, the solved
+configuration has tile i at index i (blank zero tile in upper left)
+The default heuristic is Manhattan distance plus linear conflicts, both are
+updated incrementally as the blank moves, so a node costs O(width + height)
+"""
+
+import functools
+
+# blank moves, same letters as Puzzle.update_puzzle
+INVERSE = {'u': 'd', 'd': 'u', 'l': 'r', 'r': 'l'}
+
+
+class SearchLimitExceeded(Exception):
+    """
+    Raised when the search expands more nodes than it is allowed to
+    """
+
+
+def neighbor_table(height, width):
+    """
+    List the legal blank moves from every position on the board
+    Returns a list of lists of (direction, new_position) tuples
+    """
+    table = []
+    for pos in range(height * width):
+        row, col = divmod(pos, width)
+        moves = []
+        if row > 0:
+            moves.append(('u', pos - width))
+        if row < height - 1:
+            moves.append(('d', pos + width))
+        if col > 0:
+            moves.append(('l', pos - 1))
+        if col < width - 1:
+            moves.append(('r', pos + 1))
+        table.append(moves)
+    return table
+
+
+def manhattan_table(height, width):
+    """
+    Manhattan distance of every tile from every position to its solved position
+    Returns a list of lists, table[tile][pos], the blank tile always scores 0
+    """
+    size = height * width
+    table = [[0] * size]
+    for tile in range(1, size):
+        goal_row, goal_col = divmod(tile, width)
+        table.append([abs(pos // width - goal_row) + abs(pos % width - goal_col)
+                      for pos in range(size)])
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def line_conflict(goals):
+    """
+    Extra moves forced by tiles that sit in their goal line but in reversed order
+    goals is the tuple of solved offsets (along the line) of those tiles, in board order
+    Every tile outside the longest increasing subsequence must leave the line and come back
+    Returns an integer
+    """
+    tails = []
+    for goal in goals:
+        low, high = 0, len(tails)
+        while low < high:
+            mid = (low + high) // 2
+            if tails[mid] < goal:
+                low = mid + 1
+            else:
+                high = mid
+        if low == len(tails):
+            tails.append(goal)
+        else:
+            tails[low] = goal
+    return 2 * (len(goals) - len(tails))
+
+
+class ConflictHeuristic:
+    """
+    Manhattan distance plus linear conflicts, updated one move at a time
+    Any estimator with the same reset/slide/undo methods can drive the search
+    """
+
+    def __init__(self, height, width):
+        self._width = width
+        self._distance = manhattan_table(height, width)
+        self._row_cells = [range(row * width, (row + 1) * width) for row in range(height)]
+        self._col_cells = [range(col, height * width, width) for col in range(width)]
+        self._row_lc = []
+        self._col_lc = []
+        self._history = []
+
+    def _row_conflict(self, board, row):
+        width = self._width
+        return line_conflict(tuple(tile % width for tile in map(board.__getitem__, self._row_cells[row])
+                                   if tile and tile // width == row))
+
+    def _col_conflict(self, board, col):
+        width = self._width
+        return line_conflict(tuple(tile // width for tile in map(board.__getitem__, self._col_cells[col])
+                                   if tile and tile % width == col))
+
+    def reset(self, board):
+        """
+        Evaluate a board from scratch
+        Returns an integer
+        """
+        self._row_lc = [self._row_conflict(board, row) for row in range(len(self._row_cells))]
+        self._col_lc = [self._col_conflict(board, col) for col in range(len(self._col_cells))]
+        self._history = []
+        manhattan = sum(self._distance[tile][pos] for pos, tile in enumerate(board))
+        return manhattan + sum(self._row_lc) + sum(self._col_lc)
+
+    def slide(self, board, tile, source, target):
+        """
+        Account for a tile that has just slid from source to target on the board
+        Only the two lines the tile left and entered can change their conflicts
+        Returns the change of the estimate
+        """
+        width = self._width
+        delta = self._distance[tile][target] - self._distance[tile][source]
+        if source % width == target % width:
+            lines, old_line, new_line = self._row_lc, source // width, target // width
+            old_lc, new_lc = lines[old_line], lines[new_line]
+            lines[old_line] = self._row_conflict(board, old_line)
+            lines[new_line] = self._row_conflict(board, new_line)
+        else:
+            lines, old_line, new_line = self._col_lc, source % width, target % width
+            old_lc, new_lc = lines[old_line], lines[new_line]
+            lines[old_line] = self._col_conflict(board, old_line)
+            lines[new_line] = self._col_conflict(board, new_line)
+        self._history.append((lines, old_line, new_line, old_lc, new_lc))
+        return delta + lines[old_line] + lines[new_line] - old_lc - new_lc
+
+    def undo(self):
+        """
+        Revert the last slide
+        """
+        lines, old_line, new_line, old_lc, new_lc = self._history.pop()
+        lines[old_line], lines[new_line] = old_lc, new_lc
+
+
+def solve(tiles, height, width, max_nodes=None, estimator=None):
+    """
+    Search for a shortest move string that solves the flat tile list
+    estimator defaults to the Manhattan distance plus linear conflicts
+    The tile list must be solvable, otherwise the search never terminates
+    Raises SearchLimitExceeded after expanding more than max_nodes nodes
+    Returns a string
+    """
+    board = bytearray(tiles)
+    moves = neighbor_table(height, width)
+    estimator = estimator or ConflictHeuristic(height, width)
+    slide, undo = estimator.slide, estimator.undo
+    path = []
+    expanded = 0
+
+    def search(blank, depth, bound, h, last):
+        """
+        Depth-first search below the current node, bounded by f = g + h
+        Returns None if solved, otherwise the smallest f that exceeded the bound
+        """
+        nonlocal expanded
+        if h == 0:
+            return None
+
+        expanded += 1
+        if max_nodes is not None and expanded > max_nodes:
+            raise SearchLimitExceeded(expanded)
+
+        minimum = -1
+        for direction, target in moves[blank]:
+            if direction == last:
+                continue
+
+            # slide the tile at target into the blank
+            tile = board[target]
+            board[blank] = tile
+            board[target] = 0
+            child_h = h + slide(board, tile, target, blank)
+
+            if depth + 1 + child_h <= bound:
+                path.append(direction)
+                found = search(target, depth + 1, bound, child_h, INVERSE[direction])
+                if found is None:
+                    return None
+                path.pop()
+            else:
+                found = depth + 1 + child_h
+
+            if minimum < 0 or found < minimum:
+                minimum = found
+
+            # undo the move
+            undo()
+            board[target] = tile
+            board[blank] = 0
+
+        return minimum
+
+    h = estimator.reset(board)
+    blank = board.index(0)
+    bound = h
+    while True:
+        bound = search(blank, 0, bound, h, None)
+        if bound is None:
+            return ''.join(path)
+        assert bound >= 0, "no solution exists"
@@ -0,0 +1,153 @@
+"""
+Post-optimizer for sliding puzzle move strings
+The scripted solver glues hard-coded macros together, which leaves cancelling
+pairs such as 'lr' and detours that a short search can cut. Both passes keep
+the final state of the puzzle unchanged.
+"""
+
+from collections import namedtuple
+
+import ida_star
+
+Optimized = namedtuple('Optimized', ['moves', 'before', 'after'])
+
+
+def cancel_inverses(moves):
+    """
+    Drop every move that is immediately undone, cascading like matching brackets
+    Returns a string
+    """
+    stack = []
+    for direction in moves:
+        if stack and stack[-1] == ida_star.INVERSE[direction]:
+            stack.pop()
+        else:
+            stack.append(direction)
+    return ''.join(stack)
+
+
+def apply_moves(tiles, width, moves):
+    """
+    Play a move string on a flat tile list
+    Returns the resulting tiles as bytes
+    """
+    board = bytearray(tiles)
+    offset = {'u': -width, 'd': width, 'l': -1, 'r': 1}
+    blank = board.index(0)
+    for direction in moves:
+        target = blank + offset[direction]
+        board[blank] = board[target]
+        board[target] = 0
+        blank = target
+    return bytes(board)
+
+
+def shortest_between(start, goal, height, width, limit):
+    """
+    Bidirectional breadth-first search between two boards given as bytes
+    Returns a shortest move string, or None if every path is longer than limit
+    """
+    if start == goal:
+        return ''
+
+    moves = ida_star.neighbor_table(height, width)
+    # parents[side][state] = (previous state, blank move from previous to state)
+    parents = ({start: None}, {goal: None})
+    depths = ({start: 0}, {goal: 0})
+    frontiers = ([start], [goal])
+    reached = [0, 0]
+
+    while frontiers[0] and frontiers[1] and reached[0] + reached[1] < limit:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent, depth, other = parents[side], depths[side], depths[1 - side]
+        layer = []
+        best, meet = None, None
+        for state in frontiers[side]:
+            blank = state.index(0)
+            for direction, target in moves[blank]:
+                board = bytearray(state)
+                board[blank] = board[target]
+                board[target] = 0
+                child = bytes(board)
+                if child in parent:
+                    continue
+                parent[child] = (state, direction)
+                depth[child] = reached[side] + 1
+                layer.append(child)
+                if child in other and (best is None or other[child] < best):
+                    best, meet = other[child], child
+        frontiers[side][:] = layer
+        reached[side] += 1
+        if meet is not None:
+            return _join(parents, meet)
+
+    return None
+
+
+def _join(parents, meet):
+    """
+    Rebuild the path through the meeting state
+    The backward half was searched from the goal, so its moves are inverted
+    Returns a string
+    """
+    head = []
+    state = meet
+    while parents[0][state] is not None:
+        state, direction = parents[0][state]
+        head.append(direction)
+    tail = []
+    state = meet
+    while parents[1][state] is not None:
+        state, direction = parents[1][state]
+        tail.append(ida_star.INVERSE[direction])
+    return ''.join(reversed(head)) + ''.join(tail)
+
+
+def shorten(tiles, height, width, moves, window=12, passes=4):
+    """
+    Re-solve sliding windows of the move string with a bounded optimal search
+    and splice in any shorter sub-path, consecutive windows overlap by half
+    Passes repeat until nothing improves or the pass budget is spent
+    Returns a string
+    """
+    step = max(1, window // 2)
+    for dummy_pass in range(passes):
+        improved = False
+        done = []
+        state = bytes(tiles)
+        rest = moves
+        while rest:
+            segment = rest[:window]
+            better = shortest_between(state, apply_moves(state, width, segment),
+                                      height, width, len(segment) - 1)
+            if better is not None:
+                rest = better + rest[window:]
+                improved = True
+
+            # the first half of the window is final, the second half opens the next one
+            keep = rest[:step] if len(rest) > window else rest
+            done.append(keep)
+            state = apply_moves(state, width, keep)
+            rest = rest[len(keep):]
+
+        moves = cancel_inverses(''.join(done))
+        if not improved:
+            break
+    return moves
+
+
+def optimize_moves(puzzle, moves, window=0):
+    """
+    Shorten a solution of the given puzzle (which is left unchanged)
+    Inverse pairs are always cancelled, windows of the given length are
+    re-solved optimally when window is at least 2
+    Returns an Optimized(moves, before, after) tuple
+    """
+    height, width = puzzle.height, puzzle.width
+    tiles = [puzzle.get_number(row, col) for row in range(height) for col in range(width)]
+    shorter = cancel_inverses(moves)
+    if window >= 2:
+        shorter = shorten(tiles, height, width, shorter, window)
+
+    assert apply_moves(tiles, width, shorter) == apply_moves(tiles, width, moves), "optimizer changed the final state"
+    return Optimized(shorter, len(moves), len(shorter))
@@ -0,0 +1,319 @@
+"""
+Additive pattern databases for the sliding puzzle
+The tiles are split into disjoint groups, for each group a table stores the minimum
+number of moves of the group's own tiles needed to bring them home, from every
+placement of the group on the board. Since groups never share a move, the values
+of all groups add up to an admissible heuristic.
+
+Tables are built once by breadth-first search and saved as uint8 arrays in a
+versioned binary file, which is memory-mapped on load so every process shares it
+
+Usage: python pattern_db.py HEIGHT WIDTH [FILE]
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+MAGIC = b'SPDB'
+VERSION = 1
+HEADER = struct.Struct('<4sHBBB')  # magic, version, height, width, number of groups
+UNSEEN = 255
+
+# disjoint tile groups, the solved blank sits in the upper left corner
+PARTITIONS = {
+    # 6-6-3: top row, left half and right half of the three bottom rows
+    (4, 4): ((1, 2, 3),
+             (4, 5, 8, 9, 12, 13),
+             (6, 7, 10, 11, 14, 15)),
+    # six compact 4-tile blocks, larger groups give better estimates but grow
+    # as 25! / (25 - k)!, pass a custom partition to trade memory for speed
+    (5, 5): ((1, 2, 3, 4),
+             (5, 6, 10, 11),
+             (7, 8, 9, 14),
+             (12, 13, 18, 19),
+             (15, 16, 20, 21),
+             (17, 22, 23, 24)),
+}
+
+_loaded = {}
+
+
+def default_path(height, width):
+    """
+    Location of the default database file for a board shape
+    Returns a string
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'pdb_{}x{}.bin'.format(height, width))
+
+
+def table_size(cells, group_size):
+    """
+    Number of ways to place group_size distinct tiles on the board
+    Returns an integer
+    """
+    size = 1
+    for taken in range(group_size):
+        size *= cells - taken
+    return size
+
+
+def rank(positions, cells):
+    """
+    Dense index of a placement of distinct positions (a partial permutation)
+    Returns an integer in range(table_size(cells, len(positions)))
+    """
+    index = 0
+    for i, pos in enumerate(positions):
+        smaller = 0
+        for j in range(i):
+            if positions[j] < pos:
+                smaller += 1
+        index = index * (cells - i) + pos - smaller
+    return index
+
+
+def build_table(height, width, group, verbose=False):
+    """
+    Breadth-first search backwards from the solved placement of one group
+    Moving the blank onto a tile outside the group is free, moving a group tile
+    costs one, so the search runs layer by layer with a free flood fill inside each layer
+    Returns a bytearray indexed by rank(positions of the group tiles)
+    """
+    cells = height * width
+    k = len(group)
+    moves = []
+    for pos in range(cells):
+        row, col = divmod(pos, width)
+        moves.append([target for target, legal in ((pos - width, row > 0),
+                                                   (pos + width, row < height - 1),
+                                                   (pos - 1, col > 0),
+                                                   (pos + 1, col < width - 1)) if legal])
+
+    # a state packs the group positions and the blank into 5-bit fields
+    blank_shift = 5 * k
+    table = bytearray([UNSEEN]) * table_size(cells, k)
+    distance = bytearray([UNSEEN]) * (len(table) * cells)
+
+    start = 0
+    for i, tile in enumerate(group):
+        start |= tile << (5 * i)
+    positions = list(group)
+    distance[rank(positions, cells) * cells] = 0
+
+    layer = array('Q', [start])
+    depth = 0
+    while layer:
+        stack = layer
+        layer = array('Q')
+        while stack:
+            state = stack.pop()
+            positions = [(state >> (5 * i)) & 31 for i in range(k)]
+            blank = state >> blank_shift
+            index = rank(positions, cells)
+            if distance[index * cells + blank] != depth:
+                continue  # reached again later with a lower cost
+            if table[index] > depth:
+                table[index] = depth
+
+            packed = state & ((1 << blank_shift) - 1)
+            for target in moves[blank]:
+                if target in positions:
+                    # the blank swaps with a group tile, costs one move
+                    i = positions.index(target)
+                    positions[i] = blank
+                    child = rank(positions, cells) * cells + target
+                    positions[i] = target
+                    if distance[child] == UNSEEN:
+                        distance[child] = depth + 1
+                        layer.append((packed ^ ((target ^ blank) << (5 * i))) | (target << blank_shift))
+                else:
+                    # the blank swaps with a tile outside the group, free
+                    child = index * cells + target
+                    if distance[child] > depth:
+                        distance[child] = depth
+                        stack.append(packed | (target << blank_shift))
+        depth += 1
+        if verbose:
+            print("group {}: depth {}, {} states".format(group, depth, len(layer)))
+
+    return table
+
+
+class PatternDatabase:
+    """
+    Disjoint additive pattern databases for one board shape
+    """
+
+    def __init__(self, height, width, groups, tables):
+        self._height = height
+        self._width = width
+        self._cells = height * width
+        self.groups = tuple(tuple(group) for group in groups)
+        self.tables = tables
+        self.group_of = [None] * self._cells
+        for index, group in enumerate(self.groups):
+            for tile in group:
+                self.group_of[tile] = index
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def width(self):
+        return self._width
+
+    @classmethod
+    def build(cls, height, width, groups=None, verbose=False):
+        """
+        Build all the tables for a board shape (this may take a long time)
+        groups defaults to PARTITIONS[(height, width)]
+        Returns a PatternDatabase
+        """
+        groups = groups or PARTITIONS[(height, width)]
+        tiles = sorted(tile for group in groups for tile in group)
+        assert tiles == list(range(1, height * width)), "groups must partition the tiles"
+        # build_table packs every position into 5 bits and a state into 64
+        assert height * width <= 32, "pattern databases need a board of at most 32 cells"
+        assert all(5 * (len(group) + 1) <= 64 for group in groups), "groups must have at most 11 tiles"
+
+        tables = []
+        for group in groups:
+            start = time.time()
+            tables.append(build_table(height, width, group, verbose))
+            if verbose:
+                print("group {} built in {:.1f} seconds".format(group, time.time() - start))
+        return cls(height, width, groups, tables)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a database file, the tables are read lazily by the OS
+        Returns a PatternDatabase
+        """
+        with open(path, 'rb') as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, height, width, count = HEADER.unpack_from(data, 0)
+        assert magic == MAGIC, "not a pattern database: " + path
+        assert version == VERSION, "unsupported pattern database version: " + str(version)
+
+        offset = HEADER.size
+        groups = []
+        for dummy_group in range(count):
+            size = data[offset]
+            groups.append(tuple(data[offset + 1:offset + 1 + size]))
+            offset += 1 + size
+
+        tables = []
+        view = memoryview(data)
+        for group in groups:
+            size = table_size(height * width, len(group))
+            tables.append(view[offset:offset + size])
+            offset += size
+        assert offset == len(data), "truncated pattern database: " + path
+
+        return cls(height, width, groups, tables)
+
+    def save(self, path):
+        """
+        Write the database to a file, see load
+        """
+        with open(path, 'wb') as handle:
+            handle.write(HEADER.pack(MAGIC, VERSION, self._height, self._width, len(self.groups)))
+            for group in self.groups:
+                handle.write(bytes([len(group)] + list(group)))
+            for table in self.tables:
+                handle.write(table)
+
+    def group_value(self, index, where):
+        """
+        Look up the cost of one group, where[tile] is the position of each tile
+        Returns an integer
+        """
+        return self.tables[index][rank([where[tile] for tile in self.groups[index]], self._cells)]
+
+    def heuristic(self, tiles):
+        """
+        Sum of all group costs for a flat tile list
+        Returns an integer
+        """
+        where = [0] * self._cells
+        for pos, tile in enumerate(tiles):
+            where[tile] = pos
+        return sum(self.group_value(index, where) for index in range(len(self.groups)))
+
+
+class PatternHeuristic:
+    """
+    Incremental view of a PatternDatabase for ida_star.solve
+    A slide only changes the value of the group the moved tile belongs to
+    """
+
+    def __init__(self, database):
+        self._database = database
+        self._where = []
+        self._values = []
+        self._history = []
+
+    def reset(self, board):
+        """
+        Evaluate a board from scratch
+        Returns an integer
+        """
+        database = self._database
+        self._where = [0] * len(board)
+        for pos, tile in enumerate(board):
+            self._where[tile] = pos
+        self._values = [database.group_value(index, self._where)
+                        for index in range(len(database.groups))]
+        self._history = []
+        return sum(self._values)
+
+    def slide(self, board, tile, source, target):
+        """
+        Account for a tile that has just slid from source to target on the board
+        Returns the change of the estimate
+        """
+        index = self._database.group_of[tile]
+        old = self._values[index]
+        self._where[tile] = target
+        self._values[index] = new = self._database.group_value(index, self._where)
+        self._history.append((tile, source, index, old))
+        return new - old
+
+    def undo(self):
+        """
+        Revert the last slide
+        """
+        tile, source, index, old = self._history.pop()
+        self._where[tile] = source
+        self._values[index] = old
+
+
+def load_default(height, width):
+    """
+    Load the default database for a board shape once per process
+    Returns a PatternDatabase, or None if the file has not been built
+    """
+    key = (height, width)
+    if key not in _loaded:
+        path = default_path(height, width)
+        database = PatternDatabase.load(path) if os.path.exists(path) else None
+        if database is not None:
+            shape = (database.height, database.width)
+            assert shape == key, "{} holds a {}x{} database".format(path, *shape)
+        _loaded[key] = database
+    return _loaded[key]
+
+
+if __name__ == '__main__':
+    rows, cols = int(sys.argv[1]), int(sys.argv[2])
+    output = sys.argv[3] if len(sys.argv) > 3 else default_path(rows, cols)
+    PatternDatabase.build(rows, cols, verbose=True).save(output)
+    print("saved to", output)
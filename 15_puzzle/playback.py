@@ -0,0 +1,103 @@
+"""
+Time-based playback of a move string, kept free of kivy
+The move string is never sliced while playing, an index cursor walks over it
+"""
+
+import ida_star
+
+
+class Playback:
+    """
+    Decide which moves are due on each frame
+    advance(dt) returns every move that fell due since the previous frame, so when
+    moves come faster than the display refreshes they are coalesced into one batch
+    """
+
+    def __init__(self, interval=0.15, speed=1.0):
+        self.interval = interval  # seconds per move at speed 1
+        self.speed = speed
+        self.paused = False
+        self._moves = ""
+        self._cursor = 0
+        self._elapsed = 0.0
+
+    @property
+    def moves(self):
+        return self._moves
+
+    @property
+    def position(self):
+        """
+        Number of moves played so far
+        """
+        return self._cursor
+
+    @property
+    def remaining(self):
+        return len(self._moves) - self._cursor
+
+    @property
+    def active(self):
+        """
+        True while there are moves left to play, paused or not
+        """
+        return self._cursor < len(self._moves)
+
+    def load(self, moves):
+        """
+        Start playing a new move string from the beginning
+        """
+        self._moves = moves
+        self._cursor = 0
+        self._elapsed = 0.0
+        self.paused = False
+
+    def stop(self):
+        """
+        Drop the moves that have not been played
+        """
+        self.load("")
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        self._elapsed = 0.0
+
+    def advance(self, dt):
+        """
+        Move the clock forward by dt seconds (scaled by the speed multiplier)
+        Returns the string of moves that fell due, possibly empty
+        """
+        if self.paused or not self.active:
+            return ""
+
+        self._elapsed += dt * self.speed
+        due = int(self._elapsed / self.interval)
+        if due == 0:
+            return ""
+        self._elapsed -= due * self.interval
+
+        start = self._cursor
+        self._cursor = min(start + due, len(self._moves))
+        if not self.active:
+            self._elapsed = 0.0
+        return self._moves[start:self._cursor]
+
+    def skip_to_end(self):
+        """
+        Play everything that is left at once
+        Returns the string of remaining moves
+        """
+        return self.seek(len(self._moves))
+
+    def seek(self, position):
+        """
+        Jump to a position in the move string, forward or backward
+        Returns the moves that take the board from the current position to the new one,
+        going backward plays the inverse moves in reverse order
+        """
+        position = max(0, min(position, len(self._moves)))
+        start, self._cursor = self._cursor, position
+        self._elapsed = 0.0
+        if position >= start:
+            return self._moves[start:position]
+        return ''.join(ida_star.INVERSE[direction] for direction in reversed(self._moves[position:start]))
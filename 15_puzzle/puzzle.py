@@ -0,0 +1,730 @@
+"""
+Loyd's Fifteen puzzle - solver logic, kept free of kivy so it can run headless
+Note that solved configuration has the blank (zero) tile in upper left
+"""
+
+import random
+
+import bidirectional
+import eight_puzzle
+import ida_star
+import pattern_db
+
+
+def count_inversions(sequence):
+    """
+    Count the pairs i < j with sequence[i] > sequence[j] in O(n log n)
+    with a Fenwick tree over the ranks of the values
+    Returns an integer
+    """
+    ranks = {value: index for index, value in enumerate(sorted(set(sequence)), 1)}
+    tree = [0] * (len(ranks) + 1)
+    inversions = 0
+    for seen, value in enumerate(sequence):
+        # subtract the earlier values that are not larger
+        index = ranks[value]
+        inversions += seen
+        while index:
+            inversions -= tree[index]
+            index &= index - 1
+        index = ranks[value]
+        while index < len(tree):
+            tree[index] += 1
+            index += index & -index
+    return inversions
+
+
+def _parity(tiles, width):
+    """
+    Inversion parity of the numbered tiles, plus the blank row when width is even
+    Returns 0 for the parity class of the solved configuration, 1 otherwise
+    """
+    parity = count_inversions([tile for tile in tiles if tile])
+    if width % 2 == 0:
+        parity += tiles.index(0) // width
+    return parity % 2
+
+
+def is_solvable(tiles, height, width):
+    """
+    Check whether a flat tile list can reach the solved configuration (boards of at least 2x2)
+    A horizontal move keeps the tile order, a vertical move jumps a tile over width - 1 others,
+    so the inversion parity (plus the blank row when width is even) never changes
+    Returns a boolean, False as well if the tiles are not a permutation of the board
+    """
+    if sorted(tiles) != list(range(height * width)):
+        return False
+    return _parity(tiles, width) == 0
+
+
+def random_grid(height, width, rng=random):
+    """
+    Draw a solvable configuration uniformly at random, without random walks
+    Swapping two numbered tiles flips the parity, which pairs every unsolvable
+    permutation with exactly one solvable one
+    Returns a list of lists
+    """
+    tiles = list(range(height * width))
+    rng.shuffle(tiles)
+    if _parity(tiles, width):
+        first, second = [pos for pos, tile in enumerate(tiles) if tile][:2]
+        tiles[first], tiles[second] = tiles[second], tiles[first]
+    return [tiles[row * width:(row + 1) * width] for row in range(height)]
+
+
+class Puzzle:
+    def __init__(self, puzzle_height, puzzle_width, initial_grid=None):
+        self._height = puzzle_height
+        self._width = puzzle_width
+        self._grid = [[col + puzzle_width * row
+                       for col in range(self._width)]
+                       for row in range(self._height)]
+
+        if initial_grid:
+            for row in range(puzzle_height):
+                for col in range(puzzle_width):
+                    self._grid[row][col] = initial_grid[row][col]
+
+    def __str__(self):
+        ans = ""
+        for row in range(self._height):
+            ans += str(self._grid[row])
+            ans += "\n"
+        return ans
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def width(self):
+        return self._width
+
+    def get_number(self, row, col):
+        return self._grid[row][col]
+
+    def set_number(self, row, col, value):
+        self._grid[row][col] = value
+
+    def clone(self):
+        new_puzzle = Puzzle(self._height, self._width, self._grid)
+        return new_puzzle
+
+    def is_solvable(self):
+        """
+        Check whether the puzzle can be solved at all
+        Returns a boolean
+        """
+        tiles = [self.get_number(row, col)
+                 for row in range(self._height)
+                 for col in range(self._width)]
+        return is_solvable(tiles, self._height, self._width)
+
+    ########################################################
+    # Core puzzle methods
+    ########################################################
+
+    def current_position(self, solved_row, solved_col):
+        """
+        Locate the current position of the tile that will be at
+        position (solved_row, solved_col) when the puzzle is solved
+        Returns a tuple of two integers        
+        """
+        solved_value = (solved_col + self._width * solved_row)
+
+        for row in range(self._height):
+            for col in range(self._width):
+                if self._grid[row][col] == solved_value:
+                    return (row, col)
+        assert False, "Value " + str(solved_value) + " not found"
+
+    def update_puzzle(self, move_string):
+        """
+        Updates the puzzle state based on the provided move string
+        """
+        zero_row, zero_col = self.current_position(0, 0)
+        for direction in move_string:
+            if direction == "l":
+                assert zero_col > 0, "move off grid: " + direction
+                self._grid[zero_row][zero_col] = self._grid[zero_row][zero_col - 1]
+                self._grid[zero_row][zero_col - 1] = 0
+                zero_col -= 1
+            elif direction == "r":
+                assert zero_col < self._width - 1, "move off grid: " + direction
+                self._grid[zero_row][zero_col] = self._grid[zero_row][zero_col + 1]
+                self._grid[zero_row][zero_col + 1] = 0
+                zero_col += 1
+            elif direction == "u":
+                assert zero_row > 0, "move off grid: " + direction
+                self._grid[zero_row][zero_col] = self._grid[zero_row - 1][zero_col]
+                self._grid[zero_row - 1][zero_col] = 0
+                zero_row -= 1
+            elif direction == "d":
+                assert zero_row < self._height - 1, "move off grid: " + direction
+                self._grid[zero_row][zero_col] = self._grid[zero_row + 1][zero_col]
+                self._grid[zero_row + 1][zero_col] = 0
+                zero_row += 1
+            else:
+                assert False, "invalid direction: " + direction
+
+    ##################################################################
+    # Phase one methods
+    ##################################################################
+
+    def lower_row_invariant(self, target_row, target_col):
+        """
+        Check whether the puzzle satisfies the specified invariant
+        at the given position in the bottom rows of the puzzle (target_row > 1)
+        Returns a boolean
+        """
+        # Tile zero is positioned at (i,j).
+        if self.get_number(target_row, target_col) != 0:
+            print("target tile is not zero")
+            return False
+
+        # All tiles in rows i+1 or below are positioned at their solved location.
+        for lower_row in range(target_row + 1, self._height):
+            for lower_col in range(self._width):
+                if self.get_number(lower_row, lower_col) != (lower_col + self._width * lower_row):
+                    print("tile (" + str(lower_row) + ", " + str(lower_col) + ") is not solved")
+                    return False
+
+        # All tiles in row i to the right of position (i,j) are positioned at their solved location.
+        for right_col in range(target_col + 1, self._width):
+            if self.get_number(target_row, right_col) != (right_col + self._width * target_row):
+                print("tile (" + str(target_row) + ", " + str(right_col) + ") is not solved")
+                return False
+        return True
+
+    def position_tile(self, target_row, target_col, tile_row=None, tile_col=None):
+        """
+        Move the correct tile at (tile_row, tile_col) to the target position (target_row, target_col)
+        Updates puzzle and returns a move string
+        """
+        if tile_row is None and tile_col is None:
+            tile_row = target_row
+            tile_col = target_col
+
+        move = ''
+        while self.current_position(tile_row, tile_col) != (target_row, target_col):
+            curr_pos = self.current_position(tile_row, tile_col)
+
+            # target tile's current position above the target position
+            if curr_pos[0] < target_row:
+                # move 0 tile to curr_pos
+                step = (target_row - curr_pos[0]) * 'u'
+                if curr_pos[1] <= target_col:
+                    step += (target_col - curr_pos[1]) * 'l'
+                else:
+                    step += (curr_pos[1] - target_col) * 'r'
+                self.update_puzzle(step)
+                move += step
+
+                # move 0 back to target position
+                if self.current_position(tile_row, tile_col)[0] == target_row:
+                    # if curr_pos == target, 0 must be right above it, so reset tile 0 and we're done
+                    self.update_puzzle('ld')
+                    move += 'ld'
+                    break
+                if curr_pos[1] == target_col:
+                    step = 'l' + (target_row - curr_pos[0]) * 'd' + 'r'
+                elif curr_pos[1] < target_col:
+                    step = (target_row - curr_pos[0]) * 'd' + (target_col - curr_pos[1]) * 'r'
+                else:
+                    if curr_pos[0] == 0:
+                        step = 'd' + (curr_pos[1] - target_col + 1) * 'l' + (target_row - curr_pos[0] - 1) * 'd' + 'r'
+                    else:
+                        step = 'u' + (curr_pos[1] - target_col + 1) * 'l' + (target_row - curr_pos[0] + 1) * 'd' + 'r'
+                self.update_puzzle(step)
+                move += step
+
+            # target tile's current position on the same row to the left
+            if curr_pos[0] == target_row and curr_pos[1] < target_col:
+                # move 0 tile to curr_pos
+                step = (target_col - curr_pos[1]) * 'l'
+                self.update_puzzle(step)
+                move += step
+
+                # move 0 back to target position
+                if self.current_position(tile_row, tile_col)[1] == target_col:
+                    # if curr_pos == target, 0 must be to its left, so just break out of the loop
+                    break
+                step = 'u' + (target_col - curr_pos[1]) * 'r' + 'd'
+                self.update_puzzle(step)
+                move += step
+
+            # target tile's current position on the same row to the right
+            if curr_pos[0] == target_row and curr_pos[1] > target_col:
+                # move 0 tile to curr_pos
+                step = (curr_pos[1] - target_col) * 'r'
+                self.update_puzzle(step)
+                move += step
+
+                # move 0 back to target position
+                if self.current_position(tile_row, tile_col)[1] == target_col:
+                    # if curr_pos == target, 0 must be to its right
+                    self.update_puzzle('ulld')
+                    move += 'ulld'
+                    break
+                step = 'u' + (curr_pos[1] - target_col) * 'l' + 'd'
+                self.update_puzzle(step)
+                move += step
+
+        return move
+
+    def solve_interior_tile(self, target_row, target_col):
+        """
+        Place correct tile at target position
+        Updates puzzle and returns a move string
+        """
+        assert self.lower_row_invariant(target_row, target_col), "checkpoint 1"
+        move = self.position_tile(target_row, target_col)
+        assert self.lower_row_invariant(target_row, target_col - 1), "checkpoint 2"
+
+        return move
+
+    def solve_col0_tile(self, target_row):
+        """
+        Solve tile in column zero on specified row (> 1)
+        Updates puzzle and returns a move string
+        """
+        assert self.lower_row_invariant(target_row, 0), "checkpoint 3"
+
+        # move the zero tile from (i,0) to (i−1,1)
+        self.update_puzzle('ur')
+        move = 'ur'
+        if self.current_position(target_row, 0) == (target_row, 0):
+            step = (self._width - 2) * 'r'
+            self.update_puzzle(step)
+            move += step
+            assert self.lower_row_invariant(target_row - 1, self._width - 1), "checkpoint 4"
+            return move
+
+        # move the target tile to (i−1,1)
+        step = self.position_tile(target_row - 1, 1, target_row, 0)
+        move += step
+
+        # apply the move string for a 3×2 puzzle
+        step = 'ruldrdlurdluurddlur' + (self._width - 2) * 'r'
+        self.update_puzzle(step)
+        move += step
+
+        assert self.lower_row_invariant(target_row - 1, self._width - 1), "checkpoint 5"
+        return move
+
+    #############################################################
+    # Phase two methods
+    #############################################################
+
+    def row0_invariant(self, target_col):
+        """
+        Check whether the puzzle satisfies the row zero invariant
+        at the given column (col > 1)
+        Returns a boolean
+        """
+        # Tile zero is positioned at (0,j).
+        if self.get_number(0, target_col) != 0:
+            print("target tile is not zero")
+            return False
+
+        # All tiles in row 0 but to the right of (0,j) are positioned at their solved location.
+        for right_col in range(target_col + 1, self._width):
+            if self.get_number(0, right_col) != right_col:
+                print("tile (" + str(0) + ", " + str(right_col) + ") is not solved")
+                return False
+
+        # All tiles in row 1 to the right of position (i,j-1) are positioned at their solved location.
+        for right_col in range(target_col, self._width):
+            if self.get_number(1, right_col) != (right_col + self._width):
+                print("tile (" + str(1) + ", " + str(right_col) + ") is not solved")
+                return False
+
+        # check last two rows
+        if self._height == 3:
+            first_row = 2
+        elif self._height >= 4:
+            first_row = self._height - 2
+        elif self._height == 2:
+            first_row = 999
+        for below_row in range(first_row, self._height):
+            for below_col in range(self._width):
+                if self.get_number(below_row, below_col) != (below_col + self._width * below_row):
+                    print("tile (" + str(below_row) + ", " + str(below_col) + ") is not solved")
+                    return False
+
+        return True
+
+    def row1_invariant(self, target_col):
+        """
+        Check whether the puzzle satisfies the row one invariant
+        at the given column (col > 1)
+        Returns a boolean
+        """
+        # Tile zero is positioned at (1,j).
+        if self.get_number(1, target_col) != 0:
+            print("target tile is not zero")
+            return False
+
+        # All tiles in row 1 but to the right of (1,j) are positioned at their solved location.
+        for right_col in range(target_col + 1, self._width):
+            if self.get_number(1, right_col) != (right_col + self._width):
+                print("tile (" + str(1) + ", " + str(right_col) + ") is not solved")
+                return False
+
+        # check last two rows
+        if self._height == 3:
+            first_row = 2
+        elif self._height >= 4:
+            first_row = self._height - 2
+        elif self._height == 2:
+            first_row = 999
+        for below_row in range(first_row, self._height):
+            for below_col in range(self._width):
+                if self.get_number(below_row, below_col) != (below_col + self._width * below_row):
+                    print("tile (" + str(below_row) + ", " + str(below_col) + ") is not solved")
+                    return False
+
+        return True
+
+    def solve_row0_tile(self, target_col):
+        """
+        Solve the tile in row zero at the specified column
+        Updates puzzle and returns a move string
+        """
+        assert self.row0_invariant(target_col), "checkpoint 6"
+
+        # move the zero tile from (0,j) to (1,j-1)
+        self.update_puzzle('ld')
+        move = 'ld'
+        if self.current_position(0, target_col) == (0, target_col):
+            assert self.row1_invariant(target_col - 1), "checkpoint 7"
+            return move
+
+        # move the target tile to position (1,j−1) with tile zero in position (1,j−2)
+        step = self.position_tile(1, target_col - 1, 0, target_col)
+        move += step
+
+        # apply the move string for a 2x3 puzzle
+        step = 'urdlurrdluldrruld'
+        self.update_puzzle(step)
+        move += step
+
+        assert self.row1_invariant(target_col - 1), "checkpoint 8"
+
+        return move
+
+    def solve_row1_tile(self, target_col):
+        """
+        Solve the tile in row one at the specified column
+        Updates puzzle and returns a move string
+        """
+        assert self.row1_invariant(target_col), "checkpoint 9"
+
+        move = self.position_tile(1, target_col)
+        step = 'ur'
+        self.update_puzzle(step)
+        move += step
+
+        assert self.row0_invariant(target_col), "checkpoint 10"
+
+        return move
+
+    ###########################################################
+    # Phase three methods
+    ###########################################################
+
+    def check_2x2_solved(self):
+        """
+        Check if 2x2 puzzle is solved, return a boolean
+        """
+        for row in range(2):
+            for col in range(2):
+                if self.get_number(row, col) != (col + self._width * row):
+                    return False
+        return True
+
+    def check_puzzle_solved(self):
+        """
+        Check if the whole puzzle is solved, return a boolean
+        """
+        for row in range(self._height):
+            for col in range(self._width):
+                if self.get_number(row, col) != (col + self._width * row):
+                    return False
+        return True
+
+    def solve_2x2(self):
+        """
+        Solve the upper left 2x2 part of the puzzle
+        Updates the puzzle and returns a move string
+        """
+        assert self.row1_invariant(1), "checkpoint 11"
+        move = ""
+        step = "r"
+
+        # iteratively apply "u,l,d,r", since tile 0 is at (1,1)
+        for dummy_run in range(100):
+            # check if its solved, return if so
+            if self.check_2x2_solved():
+                break
+            if step == "u":
+                step = "l"
+            elif step == "l":
+                step = "d"
+            elif step == "d":
+                step = "r"
+            elif step == "r":
+                step = "u"
+
+            self.update_puzzle(step)
+            move += step
+
+        return move
+
+    ###########################################################
+    # Optimal solver methods
+    ###########################################################
+
+    def solve_optimal(self, max_nodes=None):
+        """
+        Generate a shortest solution string
+        The 3x3 board is looked up in the 8-puzzle distance table if it has been built,
+        boards of up to 12 cells are solved exactly by a bidirectional BFS, larger ones
+        by an IDA* search using the additive pattern database of this shape if it has been built
+        Raises ida_star.SearchLimitExceeded if the search expands more than max_nodes states
+        Updates the puzzle and returns a move string
+        """
+        tiles = [self.get_number(row, col)
+                 for row in range(self._height)
+                 for col in range(self._width)]
+        assert is_solvable(tiles, self._height, self._width), "puzzle is not solvable:\n" + str(self)
+        table = eight_puzzle.load_default() if (self._height, self._width) == (3, 3) else None
+        if table is not None:
+            move = eight_puzzle.solve(tiles, table)
+        elif len(tiles) <= 12:
+            move = bidirectional.solve(tiles, self._height, self._width, max_nodes)
+        else:
+            database = pattern_db.load_default(self._height, self._width)
+            estimator = pattern_db.PatternHeuristic(database) if database else None
+            move = ida_star.solve(tiles, self._height, self._width, max_nodes, estimator)
+        self.update_puzzle(move)
+        return move
+
+    def solve_puzzle(self, mode="scripted", max_nodes=None):
+        """
+        Generate a solution string for a puzzle
+        mode "scripted" solves row by row with the invariants above (fast, long solutions)
+        mode "optimal" returns a shortest solution, or falls back to the scripted method
+        if the search expands more than max_nodes nodes
+        Updates the puzzle and returns a move string
+        """
+        assert self.is_solvable(), "puzzle is not solvable:\n" + str(self)
+
+        if mode == "optimal":
+            try:
+                return self.solve_optimal(max_nodes)
+            except ida_star.SearchLimitExceeded:
+                pass
+        else:
+            assert mode == "scripted", "invalid solver mode: " + mode
+
+        height = self.height
+        width = self.width
+        move = ""
+
+        # check if puzzle is already solved
+        if self.check_puzzle_solved():
+            return move
+
+        # move tile 0 to the last tile
+        zero_row, zero_col = self.current_position(0, 0)
+        step = (width - 1 - zero_col) * 'r' + (height - 1 - zero_row) * 'd'
+        self.update_puzzle(step)
+        move += step
+
+        # solve the bottom rows except the first 2 rows
+        if self._height >= 3:
+            for col in range(width - 1, 0, -1):
+                step = self.solve_interior_tile(height - 1, col)
+                move += step
+            step = self.solve_col0_tile(height - 1)
+            move += step
+
+        if self._height >= 4:
+            for row in range(height - 2, 1, -1):
+                for col in range(width - 1, 0, -1):
+                    step = self.solve_interior_tile(row, col)
+                    move += step
+                step = self.solve_col0_tile(row)
+                move += step
+
+        # solve the rightmost (width − 2) columns of the first two rows
+        for col in range(width - 1, 1, -1):
+            step = self.solve_row1_tile(col)
+            move += step
+            step = self.solve_row0_tile(col)
+            move += step
+
+        # solve the last 2x2 puzzle
+        step = self.solve_2x2()
+        move += step
+
+        return move
+
+
+class PackedPuzzle(Puzzle):
+    """
+    Puzzle backed by a single integer with a fixed-width bit field per cell
+    (4 bits per tile on a 4x4 board, so the whole board fits in 64 bits)
+    The position of every tile is tracked incrementally, which makes
+    current_position O(1) and a single move a couple of integer operations
+    """
+
+    def __init__(self, puzzle_height, puzzle_width, initial_grid=None):
+        self._height = puzzle_height
+        self._width = puzzle_width
+        cells = puzzle_height * puzzle_width
+        self._bits = max(4, (cells - 1).bit_length())
+        self._mask = (1 << self._bits) - 1
+        self._state = 0
+        self._where = list(range(cells))  # tile -> position
+
+        for row in range(puzzle_height):
+            for col in range(puzzle_width):
+                pos = col + puzzle_width * row
+                tile = initial_grid[row][col] if initial_grid else pos
+                self._state |= tile << (self._bits * pos)
+                self._where[tile] = pos
+
+        self._solved = sum(pos << (self._bits * pos) for pos in range(cells))
+        self._regions = {}
+
+        # where the blank lands for each direction and start position (None if off grid)
+        self._targets = {'u': [None] * cells, 'd': [None] * cells,
+                         'l': [None] * cells, 'r': [None] * cells}
+        for pos, moves in enumerate(ida_star.neighbor_table(puzzle_height, puzzle_width)):
+            for direction, target in moves:
+                self._targets[direction][pos] = target
+
+    def __str__(self):
+        ans = ""
+        for row in range(self._height):
+            ans += str([self.get_number(row, col) for col in range(self._width)])
+            ans += "\n"
+        return ans
+
+    @property
+    def state(self):
+        """
+        The packed board, cell (row, col) sits at bit bits * (col + width * row)
+        """
+        return self._state
+
+    def get_number(self, row, col):
+        return (self._state >> (self._bits * (col + self._width * row))) & self._mask
+
+    def set_number(self, row, col, value):
+        shift = self._bits * (col + self._width * row)
+        self._state = (self._state & ~(self._mask << shift)) | (value << shift)
+        self._where[value] = col + self._width * row
+
+    def clone(self):
+        new_puzzle = PackedPuzzle.__new__(PackedPuzzle)
+        new_puzzle.__dict__.update(self.__dict__)
+        new_puzzle._where = list(self._where)
+        return new_puzzle
+
+    def current_position(self, solved_row, solved_col):
+        """
+        Locate the current position of the tile that will be at
+        position (solved_row, solved_col) when the puzzle is solved
+        Returns a tuple of two integers
+        """
+        return divmod(self._where[solved_col + self._width * solved_row], self._width)
+
+    def _region_solved(self, key, positions):
+        """
+        Check with a single mask whether all the given positions hold their solved tiles
+        The mask is built once per key
+        Returns a boolean
+        """
+        mask = self._regions.get(key)
+        if mask is None:
+            mask = self._regions[key] = sum(self._mask << (self._bits * pos) for pos in positions)
+        return not (self._state ^ self._solved) & mask
+
+    def lower_row_invariant(self, target_row, target_col):
+        # everything after the target position in row-major order must be solved
+        pos = target_col + self._width * target_row
+        if self._where[0] == pos and self._region_solved(('lower', pos), range(pos + 1, len(self._where))):
+            return True
+        return Puzzle.lower_row_invariant(self, target_row, target_col)  # report the failure
+
+    def row0_invariant(self, target_col):
+        width = self._width
+        if self._where[0] == target_col and self._region_solved(
+                ('row0', target_col), list(range(target_col + 1, width)) +
+                list(range(width + target_col, 2 * width)) + self._bottom_rows()):
+            return True
+        return Puzzle.row0_invariant(self, target_col)
+
+    def row1_invariant(self, target_col):
+        width = self._width
+        if self._where[0] == width + target_col and self._region_solved(
+                ('row1', target_col), list(range(width + target_col + 1, 2 * width)) + self._bottom_rows()):
+            return True
+        return Puzzle.row1_invariant(self, target_col)
+
+    def _bottom_rows(self):
+        """
+        Positions of the rows that the row zero and row one invariants require solved
+        """
+        first_row = 2 if self._height == 3 else self._height - 2
+        return list(range(self._width * first_row, len(self._where))) if self._height > 2 else []
+
+    def check_2x2_solved(self):
+        return self._region_solved('2x2', (0, 1, self._width, self._width + 1))
+
+    def check_puzzle_solved(self):
+        return self._state == self._solved
+
+    def apply_move(self, direction):
+        """
+        Slide the blank one step in the given direction
+        Returns the number of the tile that moved
+        """
+        blank = self._where[0]
+        target = self._targets[direction][blank]
+        assert target is not None, "move off grid: " + direction
+
+        # the blank field is zero, so xor moves the tile across and clears its old field
+        shift = self._bits * target
+        tile = (self._state >> shift) & self._mask
+        self._state ^= (tile << (self._bits * blank)) | (tile << shift)
+        self._where[tile] = blank
+        self._where[0] = target
+        return tile
+
+    def undo_move(self, direction):
+        """
+        Revert a move made by apply_move in the given direction
+        """
+        self.apply_move(ida_star.INVERSE[direction])
+
+    def update_puzzle(self, move_string):
+        """
+        Updates the puzzle state based on the provided move string
+        """
+        bits, mask, where, targets = self._bits, self._mask, self._where, self._targets
+        state = self._state
+        blank = where[0]
+        for direction in move_string:
+            assert direction in targets, "invalid direction: " + direction
+            target = targets[direction][blank]
+            assert target is not None, "move off grid: " + direction
+            shift = bits * target
+            tile = (state >> shift) & mask
+            state ^= (tile << (bits * blank)) | (tile << shift)
+            where[tile] = blank
+            where[0] = blank = target
+            self._state = state  # keep the board consistent if a later move fails
@@ -0,0 +1,38 @@
+"""
+Tests of the batch solver's error records
+"""
+
+import io
+import json
+
+import batch
+
+
+def test_unreadable_lines_become_error_records():
+    records = list(batch.read_instances(io.StringIO('{"height": 2\n\n[1, 2]\n')))
+    assert [record['line'] for record in records] == [1, 3]
+    assert records[0]['error'].startswith('JSONDecodeError: ')
+    assert records[1]['error'] == 'TypeError: expected a JSON object, got list'
+    assert batch.solve_instance(records[0]) is records[0]
+
+
+def test_unsolvable_records_become_error_records():
+    bad = [{'id': 'missing'},
+           {'id': 'no tiles', 'height': 2, 'width': 0, 'grid': [[], []]},
+           {'id': 'no blank', 'height': 2, 'width': 2, 'grid': [[1, 2], [3, 4]]}]
+    for record in bad:
+        result = batch.solve_instance(record, mode='optimal')
+        assert set(result) == {'id', 'error'}, result
+        assert result['id'] == record['id']
+
+
+def test_run_writes_one_line_per_record():
+    source = io.StringIO('{"id": "ok", "height": 2, "width": 2, "grid": [[1, 0], [2, 3]]}\n'
+                         '{"id": "bad", "height": 2, "width": 0, "grid": [[], []]}\n'
+                         'not json\n')
+    target = io.StringIO()
+    assert batch.run(source, target, workers=1, chunksize=1) == 3
+    results = {result.get('id', result.get('line')): result
+               for result in map(json.loads, target.getvalue().splitlines())}
+    assert results['ok']['length'] == len(results['ok']['solution'])
+    assert 'error' in results['bad'] and 'error' in results[3]
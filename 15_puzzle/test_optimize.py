@@ -0,0 +1,36 @@
+"""
+The post-optimizer never changes where a solution ends and never makes it longer
+"""
+
+import random
+
+import pytest
+
+from optimize import apply_moves, cancel_inverses, optimize_moves
+from puzzle import PackedPuzzle, random_grid
+
+
+def flat(puzzle):
+    return [puzzle.get_number(row, col) for row in range(puzzle.height) for col in range(puzzle.width)]
+
+
+def test_cancel_inverses_cascades():
+    assert cancel_inverses('durrlu') == 'ru'
+    assert cancel_inverses('rudlrdul') == ''
+    assert cancel_inverses('lr') == ''
+
+
+@pytest.mark.parametrize('window', [0, 6, 8])
+@pytest.mark.parametrize('shape', [(3, 3), (4, 4), (3, 5)])
+def test_optimized_solution_still_solves(shape, window):
+    height, width = shape
+    rng = random.Random(window)
+    for dummy in range(5):
+        puzzle = PackedPuzzle(height, width, random_grid(height, width, rng))
+        tiles = flat(puzzle)
+        moves = puzzle.clone().solve_puzzle()
+        result = optimize_moves(puzzle, moves, window)
+        assert flat(puzzle) == tiles  # left unchanged
+        assert (result.before, result.after) == (len(moves), len(result.moves))
+        assert result.after <= result.before
+        assert apply_moves(tiles, width, result.moves) == apply_moves(tiles, width, moves)
@@ -0,0 +1,36 @@
+"""
+Playing, pausing and seeking through a move string lands on the right board
+"""
+
+import random
+
+from playback import Playback
+from puzzle import PackedPuzzle, random_grid
+
+
+def test_advance_and_seek():
+    rng = random.Random(0)
+    puzzle = PackedPuzzle(4, 4, random_grid(4, 4, rng))
+    moves = puzzle.clone().solve_puzzle()
+    states = [puzzle.clone()]
+    for direction in moves:
+        states.append(states[-1].clone())
+        states[-1].update_puzzle(direction)
+
+    playback = Playback(interval=0.15, speed=2)
+    playback.load(moves)
+    board = puzzle.clone()
+    while playback.position < len(moves) // 2:
+        board.update_puzzle(playback.advance(rng.uniform(0, 0.2)))
+        assert str(board) == str(states[playback.position])
+
+    playback.toggle_pause()
+    assert playback.advance(1) == ''
+    playback.toggle_pause()
+
+    for position in [0, len(moves), 3, len(moves) // 3, -5, len(moves) + 5]:
+        board.update_puzzle(playback.seek(position))
+        assert str(board) == str(states[playback.position])
+    assert playback.position == len(moves)
+    assert not playback.active
+    assert playback.advance(1) == ''
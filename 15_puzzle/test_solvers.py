@@ -0,0 +1,87 @@
+"""
+The optimal solvers against a plain breadth-first search over every state of small boards
+"""
+
+import random
+from collections import deque
+from itertools import permutations
+
+import pytest
+
+import bidirectional
+import eight_puzzle
+import ida_star
+from optimize import apply_moves
+from puzzle import is_solvable, random_grid
+
+
+def distances(height, width):
+    """
+    Breadth-first search from the solved board
+    Returns {tiles as bytes: number of moves} for every reachable board
+    """
+    goal = bytes(range(height * width))
+    seen = {goal: 0}
+    queue = deque([goal])
+    neighbors = ida_star.neighbor_table(height, width)
+    while queue:
+        tiles = queue.popleft()
+        blank = tiles.index(0)
+        for dummy_direction, target in neighbors[blank]:
+            child = bytearray(tiles)
+            child[blank], child[target] = child[target], 0
+            child = bytes(child)
+            if child not in seen:
+                seen[child] = seen[tiles] + 1
+                queue.append(child)
+    return seen
+
+
+@pytest.fixture(scope='module')
+def depth_3x3():
+    return distances(3, 3)
+
+
+def samples(height, width, count, seed=0):
+    rng = random.Random(seed)
+    return [[tile for row in random_grid(height, width, rng) for tile in row] for dummy in range(count)]
+
+
+def check(tiles, width, moves, depth):
+    assert apply_moves(tiles, width, moves) == bytes(range(len(tiles)))
+    assert len(moves) == depth[bytes(tiles)]
+
+
+def test_is_solvable_matches_reachability():
+    depth = distances(2, 3)
+    assert len(depth) == 360
+    for tiles in map(list, permutations(range(6))):
+        assert is_solvable(tiles, 2, 3) == (bytes(tiles) in depth)
+
+
+@pytest.mark.parametrize('solve', [
+    lambda tiles, height, width: ida_star.solve(tiles, height, width),
+    lambda tiles, height, width: bidirectional.solve(tiles, height, width),
+], ids=['ida_star', 'bidirectional'])
+def test_search_is_optimal(solve, depth_3x3):
+    depth_2x3 = distances(2, 3)
+    for tiles in samples(2, 3, 40):
+        check(tiles, 3, solve(tiles, 2, 3), depth_2x3)
+    for tiles in samples(3, 3, 15):
+        check(tiles, 3, solve(tiles, 3, 3), depth_3x3)
+
+
+def test_bidirectional_budget():
+    hardest = max(distances(2, 3).items(), key=lambda item: item[1])[0]
+    with pytest.raises(ida_star.SearchLimitExceeded):
+        bidirectional.solve(list(hardest), 2, 3, max_nodes=10)
+
+
+def test_eight_puzzle_walk(depth_3x3):
+    # the table filled from the search above, eight_puzzle.build_table takes seconds
+    table = bytearray([eight_puzzle.UNSEEN]) * eight_puzzle.STATES
+    for tiles, moves in depth_3x3.items():
+        table[eight_puzzle.state_index(list(tiles))] = moves
+    assert eight_puzzle.UNSEEN not in table
+    for tiles in samples(3, 3, 50):
+        check(tiles, 3, eight_puzzle.solve(tiles, table), depth_3x3)
@@ -1,14 +1,19 @@
-import random
+import os
+import time
+
 import numpy as np
 
 from io import BytesIO
 from PIL import Image as PilImage
 
+from kivy.animation import Animation
 from kivy.lang import Builder
+from kivy.clock import Clock
 from kivy.core.window import Keyboard
 from kivy.core.text import LabelBase
 from kivy.core.image import Image as CoreImage
-from kivy.properties import NumericProperty, ObjectProperty
+from kivy.graphics import Rectangle
+from kivy.properties import BooleanProperty, NumericProperty, ObjectProperty
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.widget import Widget
 from kivy.utils import get_color_from_hex
@@ -16,10 +21,19 @@ from kivymd.app import MDApp
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
 
+import engine
+import expectimax
+import game
+import ntuple
+from merge import merge
+from record import Recorder
+
 
 # configuration
 image_size = (1400, 100)
 image = PilImage.open("../assets/2048.png")
+record_dir = "records"  # every game is recorded here, replay with: python record.py FILE
+textures = {}  # tile textures by exponent, every crop is decoded once
 
 keymaps = {
     Keyboard.keycodes['up']: 'u',
@@ -29,7 +43,22 @@ keymaps = {
 }
 
 
+def tile_texture(index, tile_size=100):
+    """Crop the texture of a tile of value 2 ** index (0 for an empty cell) from the image."""
+    if index not in textures:
+        spacing = (index * tile_size, 0, (index + 1) * tile_size, tile_size)
+        cropped = image.crop(spacing)  # crop the image
+
+        # load image directly from the memory, render as texture
+        data = BytesIO()
+        cropped.save(data, format='png')
+        data.seek(0)  # prevent memory leak
+        textures[index] = CoreImage(BytesIO(data.read()), ext='png').texture
+    return textures[index]
+
+
 class Tile(Widget):
+    """A pooled tile widget, one per cell, updated in place whenever its value changes."""
     value = NumericProperty(0)
     texture = ObjectProperty(None)
 
@@ -40,16 +69,9 @@ class Tile(Widget):
         self.update()
 
     def update(self):
-        index = int(np.log2(self.value)) if self.value else 0
-        spacing = (index * self.tile_size, 0, (index + 1) * self.tile_size, self.tile_size)
-        cropped = image.crop(spacing)  # crop the image
-
-        # load image directly from the memory, render as texture
-        data = BytesIO()
-        cropped.save(data, format='png')
-        data.seek(0)  # prevent memory leak
-        im = CoreImage(BytesIO(data.read()), ext='png')
-        self.texture = im.texture
+        index = self.value.bit_length() - 1 if self.value else 0
+        self.texture = tile_texture(index, self.tile_size)
+        self.opacity = 1 if self.value else 0  # empty cells are painted once on the board canvas
 
 
 class Board(Widget):
@@ -58,23 +80,29 @@ class Board(Widget):
     popup = ObjectProperty(None)
 
     best_score = NumericProperty(0)
+    autoplay = BooleanProperty(False)
+    think_time = NumericProperty(0.012)  # seconds of search per AI move, below one frame
     tile_size = NumericProperty(100)
     border_size = NumericProperty(10)
+    slide_duration = NumericProperty(0.08)  # seconds, 0 to snap tiles into place
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        from kivy.core.window import Window  # once __main__ has configured the window
         Window.bind(on_key_down=self.on_key_down)
         self.rows = 4  # user-customized
         self.cols = 4  # user-customized
+        self.game = None
+        self.recorder = None
+        # the AI player searches bitboards only
+        self.player = None
+        self.network = None  # one-ply hints once the n-tuple network has been trained
+        if (self.rows, self.cols) == (engine.ROWS, engine.COLS):
+            self.player = expectimax.Expectimax(self.think_time)
+            self.network = ntuple.load_default()
         self.tiles = None
+        self.build_tiles()
         self.reset()
-        self.offset = {'u': (1, 0), 'd': (-1, 0), 'l': (0, 1), 'r': (0, -1)}
-        self.border = {
-            'u': [(0, col) for col in range(self.cols)],
-            'l': [(row, 0) for row in range(self.rows)],
-            'd': [(self.rows - 1, col) for col in range(self.cols)],
-            'r': [(row, self.cols - 1) for row in range(self.rows)]
-        }
 
     def walk_tiles(self):
         for row in range(self.rows):
@@ -86,110 +114,157 @@ class Board(Widget):
         return [self.border_size + self.tile_size * y,
                 self.border_size + self.tile_size * (self.rows - 1 - x)]
 
-    def reset(self):
+    def build_tiles(self):
+        """Paint the empty cells and create the pool of tile widgets, once per board."""
+        with self.canvas.before:
+            for x, y in self.walk_tiles():
+                Rectangle(texture=tile_texture(0), pos=self.tile_pos(x, y),
+                          size=(self.tile_size, self.tile_size))
+
         self.tiles = np.zeros((self.rows, self.cols), dtype=object)
         for x, y in self.walk_tiles():
             position = self.tile_pos(x, y)
             self.tiles[x, y] = Tile(0, pos=position, size=(self.tile_size, self.tile_size))
             self.add_widget(self.tiles[x, y])
-        self.new_tile()
-        self.new_tile()
+
+    def reset(self, seed=None):
+        # the bitboard engine handles the 4x4 board, other shapes use the grid engines
+        self.game = game.Game(self.rows, self.cols, seed)
+        if self.recorder:
+            self.recorder.close()
+        os.makedirs(record_dir, exist_ok=True)
+        path = os.path.join(record_dir, "{}-{}.rec".format(time.strftime("%Y%m%d-%H%M%S"), self.game.seed))
+        self.recorder = Recorder(path, self.rows, self.cols, self.game.seed)
+
+        self.sync_tiles()
+        self.recorder.add(None, self.new_tile())
+        self.recorder.add(None, self.new_tile())
 
     def new_tile(self):
         """Create a new tile in a randomly selected empty cell.
            The tile should be 2 90% of the time and 4 10% of the time.
+           Returns the (cell, value) of the new tile, None if the board is full.
         """
-        zeros = [(row, col) for row in range(self.cols)
-                            for col in range(self.rows)
-                            if self.tiles[row, col].value == 0]
-
-        if len(zeros) != 0:
-            random_tile = random.choice(zeros)
-            random_list = [2] * 90 + [4] * 10
-
-            new_value = random.choice(random_list)
-            new_tile = Tile(new_value,
-                            pos=self.tiles[random_tile].pos,
-                            size=(self.tile_size, self.tile_size))
-
-            self.remove_widget(self.tiles[random_tile])
-            self.tiles[random_tile] = new_tile
-            self.add_widget(new_tile)
+        spawned = self.game.spawn()
+        if spawned is None:
+            return None
+
+        # only the new tile changes, the slides of the last move keep running
+        cell, value = spawned
+        tup = divmod(cell, self.cols)
+        tile = self.tiles[tup]
+        tile.value = value
+        tile.update()
+        if self.slide_duration > 0:
+            # grow the new tile from the center of its cell
+            x, y = self.tile_pos(*tup)
+            tile.pos = (x + self.tile_size / 2, y + self.tile_size / 2)
+            tile.size = (0, 0)
+            Animation(pos=(x, y), size=(self.tile_size, self.tile_size),
+                      duration=self.slide_duration).start(tile)
+        return spawned
+
+    def sync_tiles(self):
+        """Show the engine board on the pooled tile widgets and snap them into their cells."""
+        for tup in self.walk_tiles():
+            tile = self.tiles[tup]
+            Animation.cancel_all(tile)
+            tile.pos = self.tile_pos(*tup)
+            tile.size = (self.tile_size, self.tile_size)
+            value = self.game.get_value(*tup)
+            if tile.value != value:
+                tile.value = value
+                tile.update()
+
+    def lines(self, direction):
+        """Yield the cells of every row or column, ordered towards the side the tiles slide to."""
+        if direction in 'lr':
+            for row in range(self.rows):
+                cells = [(row, col) for col in range(self.cols)]
+                yield cells if direction == 'l' else cells[::-1]
+        else:
+            for col in range(self.cols):
+                cells = [(row, col) for row in range(self.rows)]
+                yield cells if direction == 'u' else cells[::-1]
 
     def move(self, direction):
         """Move all tiles in the given direction and add a new tile if any tiles moved."""
-        legal = False
-        border = self.border[direction]
-        step = self.offset[direction]
-
-        # merge list one by one
-        for tile in border:
-            if step[0] == 0:
-                index_tuples = [(tile[0], tile[1] + step[1] * col)
-                                for col in range(self.cols)]
-            else:
-                index_tuples = [(tile[0] + step[0] * row, tile[1])
-                                for row in range(self.rows)]
-
-            old_tile_values = [self.tiles[tup].value for tup in index_tuples]
-            new_tile_values = Board.merge(old_tile_values)
-
-            # tiles list metabolism
-            for idx, tup in enumerate(index_tuples):
-                if old_tile_values[idx] != new_tile_values[idx]:
-                    legal = True
-                    old_tile = self.tiles[tup]
-                    new_tile = Tile(new_tile_values[idx], pos=old_tile.pos, size=old_tile.size)
-
-                    self.tiles[tup] = new_tile
-                    self.remove_widget(old_tile)
-                    self.add_widget(new_tile)
-
-        # update game status
-        if legal:
-            new_high = max([self.tiles[tup].value for tup in self.walk_tiles()])
-            if new_high > self.best_score:
-                self.best_score = new_high
-
-            target = [2048 for tup in self.walk_tiles() if self.tiles[tup].value == 4096]
-            if len(target) > 0:
-                self.congratulate()
-                self.reset()
-            else:
-                self.new_tile()
+        # the widgets still show the board before the move
+        lines = [(cells, [self.tiles[cell].value for cell in cells]) for cells in self.lines(direction)]
+        if not self.game.move(direction):
+            return
+
+        # the widget of each target cell slides in from the farthest tile that lands there
+        slides = {}
+        for cells, values in lines:
+            for source, target in engine.merge_moves(values):
+                if source != target:
+                    slides[cells[target]] = cells[source]
+
+        self.sync_tiles()
+        if self.slide_duration > 0:
+            for target, source in slides.items():
+                tile = self.tiles[target]
+                tile.pos = self.tile_pos(*source)
+                Animation(pos=self.tile_pos(*target), duration=self.slide_duration).start(tile)
+
+        # update game status, the game keeps track of its largest tile
+        new_high = self.game.max_tile
+        if new_high > self.best_score:
+            self.best_score = new_high
+
+        if new_high >= 4096:
+            self.recorder.add(direction, None)
+            self.autoplay = False
+            self.congratulate()
+            self.reset()
+            return
+
+        self.recorder.add(direction, self.new_tile())
+        if self.game.is_dead():
+            self.autoplay = False
+            self.game_over()
+            self.reset()
+
+    def hint(self):
+        """Let the AI play one move, the trained network answers instantly if there is one."""
+        if self.network is not None:
+            self.play_ai(self.network.best_move(self.game.board))
+        elif self.player is not None:
+            self.play_ai(self.player.best_move(self.game.board, self.think_time))
+
+    def play_ai(self, direction):
+        if direction is None:
+            self.autoplay = False
+        else:
+            self.move(direction)
+
+    def on_autoplay(self, instance, value):
+        if value:
+            Clock.schedule_interval(self.autoplay_step, 0)
+        else:
+            Clock.unschedule(self.autoplay_step)
+
+    def autoplay_step(self, interval):
+        if self.player is not None:
+            self.play_ai(self.player.best_move(self.game.board, self.think_time))
 
     @staticmethod
     def merge(line):
         """Merge a single row or column in 2048."""
-        # slide zeros to the end of the list
-        slide_zero = [num for num in line if num != 0]
-        slide_zero.extend([num for num in line if num == 0])
-
-        # merge adjacent numbers
-        merged = [False] * len(slide_zero)
-        for curr_tile in range(len(slide_zero) - 1):
-            if slide_zero[curr_tile] == slide_zero[curr_tile + 1] \
-                    and slide_zero[curr_tile] != 0 \
-                    and not merged[curr_tile]:
-                slide_zero[curr_tile] *= 2
-
-                # slide the rest of the tiles forward
-                for next_tile in range(curr_tile + 1, len(slide_zero)):
-                    try:
-                        slide_zero[next_tile] = slide_zero[next_tile + 1]
-                    except IndexError:
-                        slide_zero[next_tile] = 0
-                merged[curr_tile] = True
-            else:
-                continue
-
-        return slide_zero
+        return merge(line)
 
     def congratulate(self):
+        self.announce("Congratulations!", "You have won the 2048, nice work!")
+
+    def game_over(self):
+        self.announce("Game Over", "No more moves, the largest tile is {}.".format(self.game.max_tile))
+
+    def announce(self, title, text):
         if not self.popup:
             self.popup = MDDialog(
-                title="Congratulations!",
-                text="You have won the 2048, nice work!",
+                title=title,
+                text=text,
                 radius=[20, 20, 20, 20],
                 size_hint=(0.7, None),
                 buttons=[
@@ -198,6 +273,8 @@ class Board(Widget):
                     )
                 ]
             )
+        self.popup.title = title  # update text each time
+        self.popup.text = text
         self.popup.open()
 
     def on_key_down(self, window, key, *args):
@@ -216,6 +293,9 @@ class Game(MDApp):
         root = Root()
         return root
 
+    def on_stop(self):
+        self.root.ids.board.recorder.close()  # writes the last event if it has no pair yet
+
 
 if __name__ == '__main__':
     from kivy.config import Config
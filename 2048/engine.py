@@ -0,0 +1,359 @@
+"""
+2048 game logic, kept free of kivy so it can run headless
+The 4x4 board is a single 64-bit integer: every cell is a 4-bit exponent (0 for an
+empty cell, e for a tile of value 2 ** e), cell (row, col) sits in nibble 4 * row + col,
+so row r is the 16-bit field at bit 16 * r. A move is four lookups into tables that
+hold the result of sliding every one of the 65,536 possible rows.
+
+Other board shapes go through GridEngine, which works on tuples of tile values with
+the same interface as this module: new_board, move, legal_moves, spawn, place, is_dead,
+get_value, max_value, empty_cells
+"""
+
+import random
+
+from merge import merge, merge_line
+
+DIRECTIONS = 'udlr'
+ROWS = COLS = 4
+MAX_EXPONENT = 15  # the largest tile a nibble can hold is 2 ** 15, two of them do not merge
+
+
+def merge_moves(line):
+    """
+    Follow every tile of a line through merge(line)
+    Returns a list of (source index, target index), two sources share a target when they merge
+    """
+    moves = []
+    target = -1
+    mergeable = None  # value of the tile at target if it has not merged yet
+    for source, value in enumerate(line):
+        if value == 0:
+            continue
+        if value == mergeable:
+            mergeable = None
+        else:
+            target += 1
+            mergeable = value
+        moves.append((source, target))
+    return moves
+
+
+def _unpack_row(row):
+    return [(row >> (4 * col)) & 15 for col in range(COLS)]
+
+
+def _pack_row(exponents):
+    row = 0
+    for col, exponent in enumerate(exponents):
+        row |= exponent << (4 * col)
+    return row
+
+
+def _reverse_row(row):
+    return ((row & 15) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def _spread_column(row):
+    # nibble i of a 16-bit row becomes nibble 4 * i of a 64-bit board, i.e. column 0
+    return (row & 15) | ((row & 0xF0) << 12) | ((row & 0xF00) << 24) | ((row & 0xF000) << 36)
+
+
+def _build_tables():
+    """
+    Slide every possible row to the left and to the right
+    Returns (row left, row right, column up, column down), each a list of 65,536 entries,
+    the column tables hold the moved line spread over column 0 of a board
+    """
+    size = 1 << 16
+    left = [0] * size
+    for row in range(size):
+        # merge on values so the rules are exactly those of merge(), capped at MAX_EXPONENT,
+        # without filling the length-4 table of merge() with lines that are never looked up
+        values = [1 << exponent if exponent else 0 for exponent in _unpack_row(row)]
+        values = [value if value != 1 << MAX_EXPONENT else -col - 1
+                  for col, value in enumerate(values)]  # unique values never merge
+        merged = merge_line(values)
+        left[row] = _pack_row([MAX_EXPONENT if value < 0 else value.bit_length() - 1 if value else 0
+                               for value in merged])
+
+    right = [0] * size
+    for row in range(size):
+        right[row] = _reverse_row(left[_reverse_row(row)])
+    up = [_spread_column(moved) for moved in left]
+    down = [_spread_column(moved) for moved in right]
+    return left, right, up, down
+
+
+ROW_LEFT, ROW_RIGHT, COL_UP, COL_DOWN = _build_tables()
+ROW_MAX = [max(_unpack_row(row)) for row in range(1 << 16)]  # largest exponent of every row
+# bit 0 if sliding the row to the left changes it, bit 1 if sliding it to the right does
+ROW_MOVES = [(ROW_LEFT[row] != row) | (ROW_RIGHT[row] != row) << 1 for row in range(1 << 16)]
+MASK_DIRECTIONS = [''.join(direction for bit, direction in enumerate(DIRECTIONS) if mask >> bit & 1)
+                   for mask in range(16)]
+NIBBLE_LOW_BITS = 0x1111111111111111
+_row_scores = []
+
+
+def transpose(board):
+    """
+    Swap rows and columns
+    Returns an integer
+    """
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def new_board():
+    """
+    Returns an empty board
+    """
+    return 0
+
+
+def from_grid(grid):
+    """
+    Pack a 4x4 list of tile values (0 for empty cells)
+    Returns an integer
+    """
+    board = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            value = grid[row][col]
+            if value:
+                board |= (value.bit_length() - 1) << (4 * (COLS * row + col))
+    return board
+
+
+def to_grid(board):
+    """
+    Unpack a board into tile values
+    Returns a 4x4 list of lists
+    """
+    return [[get_value(board, row, col) for col in range(COLS)] for row in range(ROWS)]
+
+
+def get_value(board, row, col):
+    """
+    Value of the tile in a cell, 0 if the cell is empty
+    Returns an integer
+    """
+    exponent = (board >> (4 * (COLS * row + col))) & 15
+    return 1 << exponent if exponent else 0
+
+
+def max_value(board):
+    """
+    Value of the largest tile on the board, 0 if the board is empty
+    Returns an integer
+    """
+    exponent = max(ROW_MAX[board & 0xFFFF], ROW_MAX[(board >> 16) & 0xFFFF],
+                   ROW_MAX[(board >> 32) & 0xFFFF], ROW_MAX[board >> 48])
+    return 1 << exponent if exponent else 0
+
+
+def empty_mask(board):
+    """
+    Flag the empty cells without looking at them one by one
+    Returns an integer with bit 4 * cell set for every empty cell
+    """
+    occupied = board | (board >> 2)
+    occupied |= occupied >> 1
+    return ~occupied & NIBBLE_LOW_BITS
+
+
+def empty_cells(board):
+    """
+    Indices (4 * row + col) of the empty cells
+    Returns a list
+    """
+    mask = empty_mask(board)
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() >> 2)
+        mask ^= low
+    return cells
+
+
+def place(board, cell, value):
+    """
+    Put a tile of the given value in an empty cell (4 * row + col)
+    Returns the new board
+    """
+    return board | ((value.bit_length() - 1) << (4 * cell))
+
+
+def move(board, direction):
+    """
+    Slide all tiles towards one of the directions 'u', 'd', 'l' or 'r'
+    Returns the new board, equal to the old one if nothing moved
+    """
+    if direction == 'l':
+        return (ROW_LEFT[board & 0xFFFF] |
+                ROW_LEFT[(board >> 16) & 0xFFFF] << 16 |
+                ROW_LEFT[(board >> 32) & 0xFFFF] << 32 |
+                ROW_LEFT[board >> 48] << 48)
+    if direction == 'r':
+        return (ROW_RIGHT[board & 0xFFFF] |
+                ROW_RIGHT[(board >> 16) & 0xFFFF] << 16 |
+                ROW_RIGHT[(board >> 32) & 0xFFFF] << 32 |
+                ROW_RIGHT[board >> 48] << 48)
+
+    assert direction in ('u', 'd'), "unknown direction: " + str(direction)
+    table = COL_UP if direction == 'u' else COL_DOWN
+    columns = transpose(board)  # column c is now the 16-bit field at bit 16 * c
+    return (table[columns & 0xFFFF] |
+            table[(columns >> 16) & 0xFFFF] << 4 |
+            table[(columns >> 32) & 0xFFFF] << 8 |
+            table[columns >> 48] << 12)
+
+
+def row_scores():
+    """
+    Points of every one of the 65,536 rows, the sum of the tiles its merges create
+    (the same whichever way the row slides), built on first use (an n-tuple network
+    builds it as it loads)
+    Returns a list
+    """
+    if not _row_scores:
+        for row in range(1 << 16):
+            values = [1 << exponent if exponent else 0 for exponent in _unpack_row(row)]
+            targets = [target for dummy_source, target in merge_moves(values)]
+            merged = merge_line(values)
+            _row_scores.append(sum(merged[target] for target in set(targets) if targets.count(target) == 2))
+    return _row_scores
+
+
+def move_score(board, direction):
+    """
+    Points made by a move, the sum of the tiles its merges create
+    Returns an integer
+    """
+    scores = row_scores()
+    lines = board if direction in 'lr' else transpose(board)
+    return (scores[lines & 0xFFFF] + scores[(lines >> 16) & 0xFFFF] +
+            scores[(lines >> 32) & 0xFFFF] + scores[lines >> 48])
+
+
+def legal_moves(board):
+    """
+    Find the moves that change the board with eight row lookups, without making them
+    Returns a 4-bit mask, bit i is set if DIRECTIONS[i] is legal
+    """
+    columns = transpose(board)
+    vertical = (ROW_MOVES[columns & 0xFFFF] | ROW_MOVES[(columns >> 16) & 0xFFFF] |
+                ROW_MOVES[(columns >> 32) & 0xFFFF] | ROW_MOVES[columns >> 48])
+    horizontal = (ROW_MOVES[board & 0xFFFF] | ROW_MOVES[(board >> 16) & 0xFFFF] |
+                  ROW_MOVES[(board >> 32) & 0xFFFF] | ROW_MOVES[board >> 48])
+    return vertical | horizontal << 2
+
+
+def directions_of(mask):
+    """
+    Returns the directions flagged in a mask made by legal_moves, as a string
+    """
+    return MASK_DIRECTIONS[mask]
+
+
+def spawn(board, rng=random):
+    """
+    Put a new tile in a randomly selected empty cell,
+    the tile is 2 90% of the time and 4 10% of the time
+    Returns the new board, unchanged if there is no empty cell
+    """
+    cells = empty_cells(board)
+    if not cells:
+        return board
+    cell = rng.choice(cells)
+    return place(board, cell, 2 if rng.random() < 0.9 else 4)
+
+
+def is_dead(board):
+    """
+    Check whether no move can change the board
+    Returns a boolean
+    """
+    return not empty_mask(board) and not legal_moves(board)
+
+
+class GridEngine:
+    """
+    The same interface as this module for boards of any shape,
+    a board is a tuple of rows, each a tuple of tile values
+    """
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+
+    def new_board(self):
+        return tuple((0,) * self.cols for dummy_row in range(self.rows))
+
+    def get_value(self, board, row, col):
+        return board[row][col]
+
+    def max_value(self, board):
+        return max(max(row) for row in board)
+
+    def empty_cells(self, board):
+        return [self.cols * row + col
+                for row in range(self.rows)
+                for col in range(self.cols) if board[row][col] == 0]
+
+    def place(self, board, cell, value):
+        row, col = divmod(cell, self.cols)
+        grid = [list(line) for line in board]
+        grid[row][col] = value
+        return tuple(tuple(line) for line in grid)
+
+    def move(self, board, direction):
+        """
+        Merge every row or column towards the side given by direction
+        Returns the new board
+        """
+        if direction == 'l':
+            return tuple(tuple(merge(row)) for row in board)
+        if direction == 'r':
+            return tuple(tuple(merge(row[::-1])[::-1]) for row in board)
+
+        assert direction in ('u', 'd'), "unknown direction: " + str(direction)
+        columns = list(zip(*board))
+        if direction == 'u':
+            columns = [merge(column) for column in columns]
+        else:
+            columns = [merge(column[::-1])[::-1] for column in columns]
+        return tuple(zip(*columns))
+
+    def spawn(self, board, rng=random):
+        cells = self.empty_cells(board)
+        if not cells:
+            return board
+        cell = rng.choice(cells)
+        return self.place(board, cell, 2 if rng.random() < 0.9 else 4)
+
+    def legal_moves(self, board):
+        """
+        A line can slide towards its start if a tile has an empty cell or an equal tile before it
+        Returns a 4-bit mask, bit i is set if DIRECTIONS[i] is legal
+        """
+        def slides(line):
+            return any(line[i] and line[i - 1] in (0, line[i]) for i in range(1, len(line)))
+
+        columns = list(zip(*board))
+        mask = 0
+        for bit, lines in enumerate((columns, [column[::-1] for column in columns],
+                                     board, [row[::-1] for row in board])):
+            if any(slides(line) for line in lines):
+                mask |= 1 << bit
+        return mask
+
+    def is_dead(self, board):
+        return not self.empty_cells(board) and not self.legal_moves(board)
+
@@ -0,0 +1,195 @@
+"""
+Expectimax player for the 4x4 bitboard engine, kept free of kivy
+Max nodes pick the best of the four moves, chance nodes average over every empty
+cell receiving a 2 (90%) or a 4 (10%), the same odds as engine.spawn. Leaves are
+scored by a row heuristic precomputed for all 65,536 rows, applied to the four rows
+and the four columns of the board.
+
+The search deepens iteratively and gives up as soon as the time budget runs out, every
+max and chance node checks the clock, so the answer of the last completed depth is
+returned within one frame.
+"""
+
+import time
+from collections import OrderedDict
+
+import engine
+
+# heuristic weights, the usual monotonicity / empty cells / merges mix
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+_row_scores = []
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def _row_score(row):
+    """
+    Heuristic value of a single row (or column) of four exponents
+    Returns a float
+    """
+    line = [(row >> (4 * col)) & 15 for col in range(engine.COLS)]
+    total = sum(exponent ** SUM_POWER for exponent in line)
+    empty = line.count(0)
+
+    # count runs of equal non-empty tiles that could merge
+    merges = 0
+    previous, counter = 0, 0
+    for exponent in line:
+        if exponent == 0:
+            continue
+        if exponent == previous:
+            counter += 1
+        elif counter > 0:
+            merges += 1 + counter
+            counter = 0
+        previous = exponent
+    if counter > 0:
+        merges += 1 + counter
+
+    # penalize lines that are not monotonic in either direction
+    left = right = 0.0
+    for col in range(engine.COLS - 1):
+        a, b = line[col] ** MONOTONICITY_POWER, line[col + 1] ** MONOTONICITY_POWER
+        if line[col] > line[col + 1]:
+            left += a - b
+        else:
+            right += b - a
+
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(left, right) - SUM_WEIGHT * total)
+
+
+def row_scores():
+    """
+    Heuristic values of all 65,536 rows, built on first use
+    Returns a list
+    """
+    if not _row_scores:
+        _row_scores.extend(_row_score(row) for row in range(1 << 16))
+    return _row_scores
+
+
+def evaluate(board):
+    """
+    Static value of a board, the sum of its rows and columns
+    Returns a float
+    """
+    scores = row_scores()
+    columns = engine.transpose(board)
+    return (scores[board & 0xFFFF] + scores[(board >> 16) & 0xFFFF] +
+            scores[(board >> 32) & 0xFFFF] + scores[board >> 48] +
+            scores[columns & 0xFFFF] + scores[(columns >> 16) & 0xFFFF] +
+            scores[(columns >> 32) & 0xFFFF] + scores[columns >> 48])
+
+
+def search_depth(empty):
+    """
+    Deepest search worth trying with a number of empty cells,
+    crowded boards branch less and are the ones that need looking ahead
+    Returns an integer
+    """
+    if empty > 6:
+        return 2
+    if empty > 3:
+        return 3
+    return 4
+
+
+class Expectimax:
+    """
+    Depth-limited expectimax search with a bounded LRU transposition table
+    """
+
+    def __init__(self, time_budget=0.012, cache_size=10000, min_probability=0.0001):
+        self.time_budget = time_budget  # seconds per call of best_move
+        self.cache_size = cache_size
+        self.min_probability = min_probability  # chance branches less likely than this are not expanded
+        self._cache = OrderedDict()  # (board, depth) -> value, only of subtrees searched in full
+        self._deadline = None
+        self._cutoffs = 0  # chance nodes left unexpanded for their low probability so far
+        row_scores()
+
+    def best_move(self, board, time_budget=None):
+        """
+        Search deeper and deeper until the time budget runs out
+        Returns the best direction found, or None if no move changes the board
+        """
+        budget = self.time_budget if time_budget is None else time_budget
+        self._deadline = time.perf_counter() + budget
+        legal = engine.legal_moves(board)
+        if not legal:
+            return None
+        children = [(direction, engine.move(board, direction))
+                    for direction in engine.directions_of(legal)]
+
+        # a single ply is cheap and always completes, it counts against the budget too
+        best = max(children, key=lambda item: evaluate(item[1]))[0]
+        if time.perf_counter() > self._deadline:
+            return best
+        for depth in range(2, search_depth(len(engine.empty_cells(board))) + 1):
+            try:
+                values = [(self._expect(child, depth - 1, 1.0), direction) for direction, child in children]
+            except SearchTimeout:
+                break
+            best = max(values)[1]
+        return best
+
+    def _expect(self, board, depth, probability):
+        """
+        Chance node: average over the tiles that may spawn after a move
+        A value is only cached if no branch below was cut off for its low probability,
+        otherwise it would stand for a shallower search wherever the board comes again
+        Returns a float
+        """
+        if depth <= 0:
+            return evaluate(board)
+        if probability < self.min_probability:
+            self._cutoffs += 1
+            return evaluate(board)
+        if time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+
+        key = (board, depth)
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        cells = engine.empty_cells(board)
+        if not cells:
+            return evaluate(board)
+        share = probability / len(cells)
+        cutoffs = self._cutoffs
+        total = 0.0
+        for cell in cells:
+            shift = 4 * cell
+            total += 0.9 * self._max(board | (1 << shift), depth, share * 0.9)
+            total += 0.1 * self._max(board | (2 << shift), depth, share * 0.1)
+        value = total / len(cells)
+
+        if self._cutoffs == cutoffs:
+            cache[key] = value
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return value
+
+    def _max(self, board, depth, probability):
+        """
+        Max node: the best move of the player, 0 if the game is lost
+        Returns a float
+        """
+        if time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        best = 0.0
+        for direction in engine.directions_of(engine.legal_moves(board)):
+            best = max(best, self._expect(engine.move(board, direction), depth - 1, probability))
+        return best
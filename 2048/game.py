@@ -0,0 +1,136 @@
+"""
+One game of 2048 on any board shape, kept free of kivy
+The game owns its random stream, so the same seed always spawns the same tiles, and it
+keeps a mask of the empty cells and the largest tile up to date as the board changes:
+a move only looks at the lines it changed, spawning picks a bit of the mask and the
+win check reads one number.
+"""
+
+import random
+
+import engine
+from vectorized import make_engine
+
+
+class Game:
+    """
+    A board, its engine and a seeded random stream for the spawns
+    """
+
+    def __init__(self, rows=4, cols=4, seed=None):
+        self.engine = make_engine(rows, cols)
+        self.rows = rows
+        self.cols = cols
+        self.seed = random.SystemRandom().getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.board = self.engine.new_board()
+        # bit stride * cell is set for every empty cell (cell = row * cols + col), the bitboard's
+        # own empty mask has a bit per nibble, other engines a bit per cell
+        self.stride = 4 if self.engine is engine else 1
+        if self.engine is engine:
+            self.empty = engine.empty_mask(self.board)
+        else:
+            self.empty = (1 << rows * cols) - 1
+            self.line_masks = self.build_line_masks()
+        self.empty_count = rows * cols
+        self.max_tile = 0
+        self.moves = 0
+
+    def get_value(self, row, col):
+        return self.engine.get_value(self.board, row, col)
+
+    def move(self, direction):
+        """
+        Slide all tiles towards one of 'u', 'd', 'l' or 'r'
+        On the bitboard the empty cells come from a mask and the largest tile from
+        four row lookups, other engines update both from the lines the move changed
+        Returns True if the board changed
+        """
+        before = self.board
+        board = self.engine.move(before, direction)
+        if board == before:
+            return False
+        self.board = board
+        if self.engine is engine:
+            self.empty = engine.empty_mask(board)
+            self.empty_count = bin(self.empty).count('1')
+            self.max_tile = max(self.max_tile, engine.max_value(board))
+        else:
+            self._update_lines(before, board, direction)
+        self.moves += 1
+        return True
+
+    def build_line_masks(self):
+        """
+        Empty cells of every row and column once a move has packed k tiles against its side
+        Returns {direction: [[mask for k tiles] for every line]}, the mask for 0 tiles is the whole line
+        """
+        rows, cols = self.rows, self.cols
+        line_masks = {}
+        for direction in 'udlr':
+            if direction in 'lr':
+                lines = [[cols * row + col for col in range(cols)] for row in range(rows)]
+            else:
+                lines = [[cols * row + col for row in range(rows)] for col in range(cols)]
+            if direction in 'rd':
+                lines = [cells[::-1] for cells in lines]  # ordered towards the side the tiles slide to
+            line_masks[direction] = [[sum(1 << cell for cell in cells[tiles:]) for tiles in range(len(cells) + 1)]
+                                     for cells in lines]
+        return line_masks
+
+    def _update_lines(self, before, after, direction):
+        """
+        Update the empty cells and the largest tile from the rows (or columns) that changed
+        """
+        if direction in 'lr':
+            lines = zip(before, after)
+        else:
+            lines = zip(zip(*before), zip(*after))
+        for masks, (old_line, new_line) in zip(self.line_masks[direction], lines):
+            if old_line == new_line:
+                continue
+            empty = new_line.count(0)
+            self.empty = self.empty & ~masks[0] | masks[len(new_line) - empty]
+            self.empty_count += empty - old_line.count(0)
+            self.max_tile = max(self.max_tile, max(new_line))
+
+    def spawn(self):
+        """
+        Put a 2 (90% of the time) or a 4 in a random empty cell
+        Returns (cell, value) of the new tile, or None if the board is full
+        """
+        if not self.empty_count:
+            return None
+        # the empty cells are numbered in board order, as in engine.empty_cells
+        mask = self.empty
+        for dummy in range(self.rng.randrange(self.empty_count)):
+            mask &= mask - 1
+        cell = ((mask & -mask).bit_length() - 1) // self.stride
+        value = 2 if self.rng.random() < 0.9 else 4
+        self.place(cell, value)
+        return cell, value
+
+    def place(self, cell, value):
+        """
+        Put a tile in an empty cell, used by spawn and to replay recorded spawns
+        """
+        bit = 1 << (self.stride * cell)
+        assert self.empty & bit, "cell is not empty: " + str(cell)
+        self.board = self.engine.place(self.board, cell, value)
+        self.empty ^= bit
+        self.empty_count -= 1
+        if value > self.max_tile:
+            self.max_tile = value
+
+    def legal_moves(self):
+        """
+        Returns a 4-bit mask, bit i is set if engine.DIRECTIONS[i] changes the board
+        """
+        return self.engine.legal_moves(self.board)
+
+    def is_dead(self):
+        """
+        Check whether no move can change the board, the game is lost
+        Returns a boolean
+        """
+        return not self.empty_count and not self.legal_moves()
@@ -0,0 +1,135 @@
+"""
+The 2048 merge, shared by every board implementation in this folder
+A line is merged towards its start in one pass: every non-empty tile either merges
+with the tile waiting before it or becomes the waiting tile. Lines of length 4 (every
+row and column of the standard board) go through a lookup table filled on first sight
+of each line, any other length uses the pass directly.
+
+legacy_merge is the original shifting implementation, kept as the reference the
+differential check compares against.
+
+Usage: python merge.py check [MAX_LENGTH]    compare with legacy_merge on every small line
+       python merge.py bench                 merges per second of both implementations
+"""
+
+import itertools
+import random
+import sys
+import time
+
+TABLE_LIMIT = 1 << 16  # at most as many length-4 lines as the bitboard can represent
+
+_table = {}
+
+
+def merge_line(line):
+    """
+    Merge a single row or column towards its start (index 0), in one pass
+    Returns a new list of the same length
+    """
+    merged = []
+    waiting = 0  # the last tile kept, while it can still merge
+    for value in line:
+        if not value:
+            continue
+        if value == waiting:
+            merged.append(2 * value)
+            waiting = 0
+        else:
+            if waiting:
+                merged.append(waiting)
+            waiting = value
+    if waiting:
+        merged.append(waiting)
+    merged.extend([0] * (len(line) - len(merged)))
+    return merged
+
+
+def merge(line):
+    """
+    Merge a single row or column towards its start (index 0)
+    Returns a new list of the same length
+    """
+    if len(line) != 4:
+        return merge_line(line)
+    key = tuple(line)
+    merged = _table.get(key)
+    if merged is None:
+        merged = tuple(merge_line(line))
+        if len(_table) < TABLE_LIMIT:
+            _table[key] = merged
+    return list(merged)
+
+
+def legacy_merge(line):
+    """
+    Reference implementation: slide the zeros out, then shift the tail of the list
+    one slot for every merge
+    Returns a new list of the same length
+    """
+    # slide zeros to the end of the list
+    slide_zero = [num for num in line if num != 0]
+    slide_zero.extend([num for num in line if num == 0])
+
+    # merge adjacent numbers
+    merged = [False] * len(slide_zero)
+    for curr_tile in range(len(slide_zero) - 1):
+        if slide_zero[curr_tile] == slide_zero[curr_tile + 1] \
+                and slide_zero[curr_tile] != 0 \
+                and not merged[curr_tile]:
+            slide_zero[curr_tile] *= 2
+
+            # slide the rest of the tiles forward
+            for next_tile in range(curr_tile + 1, len(slide_zero)):
+                try:
+                    slide_zero[next_tile] = slide_zero[next_tile + 1]
+                except IndexError:
+                    slide_zero[next_tile] = 0
+            merged[curr_tile] = True
+        else:
+            continue
+
+    return slide_zero
+
+
+def check(max_length=7, values=(0, 2, 4, 8, 16)):
+    """
+    Compare merge and merge_line with legacy_merge on every line up to max_length
+    made of the given values
+    Returns the number of lines checked
+    """
+    count = 0
+    for length in range(max_length + 1):
+        for line in itertools.product(values, repeat=length):
+            expected = legacy_merge(list(line))
+            assert merge(list(line)) == expected, "merge differs on {}".format(line)
+            assert merge_line(line) == expected, "merge_line differs on {}".format(line)
+            count += 1
+    return count
+
+
+def bench(seconds=1.0):
+    """
+    Print merges per second of legacy_merge, merge_line and merge on random lines
+    """
+    rng = random.Random(0)
+    for length in (4, 8, 16):
+        lines = [[rng.choice((0, 0, 2, 2, 4, 8, 16, 32)) for dummy in range(length)] for dummy in range(1000)]
+        for function in (legacy_merge, merge_line, merge):
+            count = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                for line in lines:
+                    function(line)
+                count += len(lines)
+            rate = count / (time.perf_counter() - start)
+            print("length {:>2} {:>12}: {:>10.0f} merges/s".format(length, function.__name__, rate))
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    if command == 'check':
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+        print("{} lines agree with legacy_merge".format(check(limit)))
+    else:
+        bench()
@@ -0,0 +1,214 @@
+"""
+N-tuple network value function for the 4x4 board, kept free of kivy
+Each tuple is a fixed list of cells, the exponents found in those cells form an index
+into a table of weights, and the value of a board is the sum of the weights picked by
+every tuple under the eight symmetries of the board (which share one table).
+
+The weights are float32 NumPy arrays stored in a single .npy file and memory-mapped
+for play, so every process shares them. They are learnt offline by temporal-difference
+learning on afterstates (the board right after a move, before the spawn) from
+headless self-play.
+
+Usage: python ntuple.py train [--games N] [--alpha A] [--seed S] [--output FILE]
+"""
+
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+import engine
+
+# straight lines and squares of four cells, (row, col)
+TUPLES = (
+    ((0, 0), (0, 1), (0, 2), (0, 3)),
+    ((1, 0), (1, 1), (1, 2), (1, 3)),
+    ((0, 0), (0, 1), (1, 0), (1, 1)),
+    ((0, 1), (0, 2), (1, 1), (1, 2)),
+    ((1, 1), (1, 2), (2, 1), (2, 2)),
+)
+TUPLE_SIZE = 4
+
+_loaded = {}
+
+
+def default_path():
+    """
+    Location of the default weight file
+    Returns a string
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ntuple.npy')
+
+
+def symmetries(cells):
+    """
+    The cells of a tuple under the four rotations of the board, with and without mirroring
+    Returns a list of 8 lists of cell indices (4 * row + col)
+    """
+    last = engine.ROWS - 1
+    variants = []
+    for mirror in (False, True):
+        current = [(row, last - col) if mirror else (row, col) for row, col in cells]
+        for dummy_rotation in range(4):
+            variants.append([engine.COLS * row + col for row, col in current])
+            current = [(col, last - row) for row, col in current]
+    return variants
+
+
+class NTupleNetwork:
+    """
+    Sum of tuple weights over the eight symmetries of a board
+    """
+
+    def __init__(self, weights):
+        assert weights.shape == (len(TUPLES), 16 ** TUPLE_SIZE), "weights do not match TUPLES"
+        self.weights = weights
+        self._tables = [memoryview(table) for table in weights]  # fast scalar access, no numpy scalars
+        # (table, shifts of the cells) for every tuple and symmetry
+        self._features = [(index, [4 * cell for cell in cells])
+                          for index, pattern in enumerate(TUPLES)
+                          for cells in symmetries(pattern)]
+        # best_move scores moves from this table, build it now rather than on the first hint
+        engine.row_scores()
+
+    @classmethod
+    def zeros(cls):
+        return cls(np.zeros((len(TUPLES), 16 ** TUPLE_SIZE), dtype=np.float32))
+
+    @classmethod
+    def load(cls, path, writable=False):
+        """
+        Load a weight file, memory-mapped read-only unless the weights are to be trained
+        Returns an NTupleNetwork
+        """
+        return cls(np.load(path) if writable else np.load(path, mmap_mode='r'))
+
+    def save(self, path):
+        """
+        Write the weights to a .npy file, replacing it only once it is complete
+        """
+        partial = path + '.partial'
+        with open(partial, 'wb') as handle:
+            np.save(handle, self.weights)
+        os.replace(partial, path)
+
+    def _indices(self, board):
+        for table, shifts in self._features:
+            index = 0
+            for position, shift in enumerate(shifts):
+                index |= ((board >> shift) & 15) << (4 * position)
+            yield table, index
+
+    def value(self, board):
+        """
+        Estimated points still to be made from an afterstate
+        Returns a float
+        """
+        tables = self._tables
+        return sum(tables[table][index] for table, index in self._indices(board))
+
+    def update(self, board, delta):
+        """
+        Move the value of a board by delta, spread evenly over its features
+        """
+        tables = self._tables
+        share = delta / len(self._features)
+        for table, index in self._indices(board):
+            tables[table][index] += share
+
+    def best_move(self, board):
+        """
+        One-ply greedy move: the largest points made plus value of the afterstate
+        Returns a direction, or None if no move changes the board
+        """
+        best, best_value = None, None
+        for direction in engine.directions_of(engine.legal_moves(board)):
+            after = engine.move(board, direction)
+            value = engine.move_score(board, direction) + self.value(after)
+            if best_value is None or value > best_value:
+                best, best_value = direction, value
+        return best
+
+
+def load_default():
+    """
+    Load the default weights once per process
+    Returns an NTupleNetwork, or None if the file has not been trained
+    """
+    if 'network' not in _loaded:
+        path = default_path()
+        _loaded['network'] = NTupleNetwork.load(path) if os.path.exists(path) else None
+    return _loaded['network']
+
+
+def train_game(network, alpha, rng):
+    """
+    Play one game greedily and learn from it, TD(0) on afterstates:
+    V(after) moves towards the points of the next move plus V(next after), 0 at the end
+    Returns (points, largest tile, number of moves)
+    """
+    board = engine.spawn(engine.spawn(engine.new_board(), rng), rng)
+    previous = None
+    points = moves = 0
+    while True:
+        direction = network.best_move(board)
+        if direction is None:
+            break
+        reward = engine.move_score(board, direction)
+        after = engine.move(board, direction)
+        if previous is not None:
+            network.update(previous, alpha * (reward + network.value(after) - network.value(previous)))
+        previous = after
+        points += reward
+        moves += 1
+        board = engine.spawn(after, rng)
+
+    if previous is not None:
+        network.update(previous, -alpha * network.value(previous))
+    return points, engine.max_value(board), moves
+
+
+def train(network, games, alpha=0.1, seed=None, report_every=100, path=None):
+    """
+    Self-play training, prints progress and saves the weights after every report if path is given
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    points, reached, moves = [], 0, 0
+    for game in range(1, games + 1):
+        score, tile, length = train_game(network, alpha, rng)
+        points.append(score)
+        reached += tile >= 2048
+        moves += length
+        if game % report_every == 0 or game == games:
+            elapsed = time.perf_counter() - start
+            print("game {}: mean points {:.0f}, 2048 reached {:.1%}, {:.0f} moves/s".format(
+                game, sum(points) / len(points), reached / len(points), moves / elapsed))
+            points, reached = [], 0
+            if path:
+                network.save(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the n-tuple network by self-play.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    learn = commands.add_parser('train', help="continue training the weights, or start from zero")
+    learn.add_argument('--games', type=int, default=1000)
+    learn.add_argument('--alpha', type=float, default=0.1, help="learning rate, spread over the features")
+    learn.add_argument('--seed', type=int, default=None)
+    learn.add_argument('--report-every', type=int, default=100)
+    learn.add_argument('--output', default=default_path())
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.output):
+        network = NTupleNetwork.load(args.output, writable=True)
+    else:
+        network = NTupleNetwork.zeros()
+    train(network, args.games, args.alpha, args.seed, args.report_every, args.output)
+    print("saved to", args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Compact binary records of 2048 games, kept free of kivy
+A record is a header (magic, version, board shape and the seed of the game) followed
+by one event per move: a direction nibble and a spawn byte. Two events share three
+bytes, [direction 1 | direction 2 << 4][spawn 1][spawn 2], so a 10,000 move game takes
+about 15 KB. Events are appended while the game is played and replayed through the
+pure-logic engine without any rendering.
+
+direction nibble: index in engine.DIRECTIONS, NO_MOVE for the two initial tiles,
+                  PADDING for the unused half of the last three bytes
+spawn byte: cell (row * cols + col) in the low 7 bits, high bit set for a 4,
+            NO_SPAWN if no tile appeared (the winning move)
+
+Usage: python record.py FILE [--moves N] [--verify]
+"""
+
+import argparse
+import struct
+import time
+
+import engine
+from game import Game
+
+MAGIC = b'2048'
+VERSION = 1
+HEADER = struct.Struct('<4sHBBQ')  # magic, version, rows, cols, seed
+NO_MOVE = 4
+PADDING = 15
+NO_SPAWN = 255
+
+
+def encode_spawn(spawn):
+    """
+    Pack a (cell, value) pair, or None, into a byte
+    Returns an integer
+    """
+    if spawn is None:
+        return NO_SPAWN
+    cell, value = spawn
+    assert cell < 127 and value in (2, 4), "spawn cannot be recorded: " + str(spawn)
+    return cell | (0x80 if value == 4 else 0)
+
+
+def decode_spawn(byte):
+    """
+    Returns the (cell, value) pair packed by encode_spawn, or None
+    """
+    if byte == NO_SPAWN:
+        return None
+    return byte & 0x7F, 4 if byte & 0x80 else 2
+
+
+class Recorder:
+    """
+    Append the events of one game to a record file as they happen
+    """
+
+    def __init__(self, path, rows, cols, seed):
+        self._handle = open(path, 'wb')
+        self._handle.write(HEADER.pack(MAGIC, VERSION, rows, cols, seed))
+        self._pending = None  # first event of an incomplete pair
+
+    def add(self, direction, spawn):
+        """
+        Record a move (None for an initial tile) and the tile it spawned (None if none)
+        """
+        event = (NO_MOVE if direction is None else engine.DIRECTIONS.index(direction), encode_spawn(spawn))
+        if self._pending is None:
+            self._pending = event
+            return
+        first, self._pending = self._pending, None
+        self._handle.write(bytes([first[0] | event[0] << 4, first[1], event[1]]))
+        self._handle.flush()
+
+    def close(self):
+        if self._pending is not None:
+            first = self._pending
+            self._handle.write(bytes([first[0] | PADDING << 4, first[1], NO_SPAWN]))
+            self._pending = None
+        self._handle.close()
+
+
+def read_record(path):
+    """
+    Parse a record file, an incomplete trailing pair is ignored
+    Returns (rows, cols, seed, events) where events is a list of (direction or None, spawn or None)
+    """
+    with open(path, 'rb') as handle:
+        data = handle.read()
+    magic, version, rows, cols, seed = HEADER.unpack_from(data, 0)
+    assert magic == MAGIC, "not a 2048 record: " + path
+    assert version == VERSION, "unsupported 2048 record version: " + str(version)
+
+    events = []
+    for offset in range(HEADER.size, len(data) - 2, 3):
+        directions, first, second = data[offset], data[offset + 1], data[offset + 2]
+        for nibble, byte in ((directions & 15, first), (directions >> 4, second)):
+            if nibble == PADDING:
+                continue
+            direction = None if nibble == NO_MOVE else engine.DIRECTIONS[nibble]
+            events.append((direction, decode_spawn(byte)))
+    return rows, cols, seed, events
+
+
+def replay(path, moves=None, verify=False):
+    """
+    Rebuild the game of a record after a number of moves (all of them by default)
+    With verify, spawns are drawn again from the seed and checked against the record,
+    otherwise they are placed as recorded
+    Returns a Game
+    """
+    rows, cols, seed, events = read_record(path)
+    game = Game(rows, cols, seed)
+    for direction, spawn in events:
+        if direction is not None:
+            if moves is not None and game.moves >= moves:
+                break
+            assert game.move(direction), "recorded move does not change the board: " + direction
+        if spawn is not None:
+            if verify:
+                assert game.spawn() == spawn, "spawn differs from the seed: " + str(spawn)
+            else:
+                game.place(*spawn)
+    return game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a 2048 game record.")
+    parser.add_argument('record')
+    parser.add_argument('--moves', type=int, default=None, help="stop after this many moves")
+    parser.add_argument('--verify', action='store_true', help="check the spawns against the seed")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    game = replay(args.record, args.moves, args.verify)
+    elapsed = time.perf_counter() - start
+    for row in range(game.rows):
+        print(' '.join('{:>5}'.format(game.get_value(row, col) or '.') for col in range(game.cols)))
+    print("seed {}, {} moves, largest tile {}, replayed in {:.1f} ms".format(
+        game.seed, game.moves, game.max_tile, 1000 * elapsed))
+
+
+if __name__ == '__main__':
+    main()
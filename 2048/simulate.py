@@ -0,0 +1,255 @@
+"""
+Headless 2048 simulator, no kivy involved
+Plays many games of a policy over a process pool and reports the distribution of the
+largest tile, the number of moves and the throughput. Every game gets its own RNG
+seeded from the base seed and the game number, so results do not depend on the
+number of workers.
+
+A policy is a callable policy(game_engine, board, rng) returning one of 'u', 'd', 'l', 'r',
+or None to give up; a move that does not change the board also ends the game.
+Built-in policies are random, corner, expectimax and ntuple, any other callable can be
+given as module:function. On boards other than 4x4, random and corner games only look
+at the legal moves, so a chunk of them is played in lockstep: every move of every game
+is made by four NumPy calls (vectorized.move_batch), with the same results as one by one.
+
+Usage: python simulate.py --games 10000 --policy corner --workers 8 --seed 1
+       python simulate.py --games 100 --rows 5 --cols 5 --policy mymodule:my_policy
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import engine
+from vectorized import make_engine, move_batch
+
+CORNER_ORDER = 'ulrd'  # keep the large tiles in the upper left corner
+
+
+def random_choice(mask, rng):
+    """
+    Any direction of a legal-move mask, uniformly
+    """
+    directions = engine.directions_of(mask)
+    return rng.choice(directions) if directions else None
+
+
+def corner_choice(mask, rng):
+    """
+    The first direction in CORNER_ORDER of a legal-move mask
+    """
+    legal = engine.directions_of(mask)
+    for direction in CORNER_ORDER:
+        if direction in legal:
+            return direction
+    return None
+
+
+def random_policy(game_engine, board, rng):
+    """
+    Any move that changes the board, uniformly
+    """
+    return random_choice(game_engine.legal_moves(board), rng)
+
+
+def corner_policy(game_engine, board, rng):
+    """
+    The first move in CORNER_ORDER that changes the board
+    """
+    return corner_choice(game_engine.legal_moves(board), rng)
+
+
+def expectimax_policy(time_budget=0.005):
+    """
+    Build an expectimax player, only for the 4x4 engine
+    Returns a policy
+    """
+    import expectimax
+    player = expectimax.Expectimax(time_budget)
+
+    def policy(game_engine, board, rng):
+        assert game_engine is engine, "expectimax only plays 4x4 boards"
+        return player.best_move(board)
+    return policy
+
+
+def ntuple_policy():
+    """
+    One-ply greedy player over the trained n-tuple network, only for the 4x4 engine
+    Returns a policy
+    """
+    import ntuple
+    network = ntuple.load_default()
+    assert network is not None, "train the network first: python ntuple.py train"
+
+    def policy(game_engine, board, rng):
+        assert game_engine is engine, "the n-tuple network only plays 4x4 boards"
+        return network.best_move(board)
+    return policy
+
+
+POLICIES = {
+    'random': lambda: random_policy,
+    'corner': lambda: corner_policy,
+    'expectimax': expectimax_policy,
+    'ntuple': ntuple_policy,
+}
+
+# policies that only look at the legal moves, which play_batch finds for many boards at once
+MASK_POLICIES = {
+    'random': random_choice,
+    'corner': corner_choice,
+}
+
+
+def load_policy(name):
+    """
+    Look up a built-in policy or import one given as module:function
+    Returns a policy
+    """
+    if name in POLICIES:
+        return POLICIES[name]()
+    assert ':' in name, "unknown policy: " + name
+    module, function = name.split(':', 1)
+    return getattr(importlib.import_module(module), function)
+
+
+def play(game_engine, policy, rng, max_moves=None):
+    """
+    Play one game from two random tiles until the policy gives up or the board is stuck
+    Returns (largest tile, number of moves)
+    """
+    board = game_engine.spawn(game_engine.spawn(game_engine.new_board(), rng), rng)
+    moves = 0
+    while max_moves is None or moves < max_moves:
+        direction = policy(game_engine, board, rng)
+        if direction is None:
+            break
+        moved = game_engine.move(board, direction)
+        if moved == board:
+            break
+        board = game_engine.spawn(moved, rng)
+        moves += 1
+    return game_engine.max_value(board), moves
+
+
+def play_batch(game_engine, choose, rngs, max_moves=None):
+    """
+    Play one game per RNG in lockstep on a grid engine, choose(mask, rng) picks the moves
+    Each RNG is drawn from exactly as play draws from it, so every game ends the same
+    Returns a list of (largest tile, number of moves)
+    """
+    boards = np.array([game_engine.spawn(game_engine.spawn(game_engine.new_board(), rng), rng)
+                       for rng in rngs])
+    moves = [0] * len(rngs)
+    playing = list(range(len(rngs)))
+    while playing:
+        current = boards[playing]
+        moved = [move_batch(current, direction) for direction in engine.DIRECTIONS]
+        masks = sum(np.any(after != current, axis=(-2, -1)).astype(int) << bit
+                    for bit, after in enumerate(moved)).tolist()
+
+        still_playing = []
+        for index, game in enumerate(playing):
+            rng = rngs[game]
+            if max_moves is not None and moves[game] >= max_moves:
+                continue
+            direction = choose(masks[index], rng)
+            if direction is None:
+                continue
+            board = moved[engine.DIRECTIONS.index(direction)][index]
+            cells = np.flatnonzero(board == 0).tolist()  # row by row, as GridEngine.empty_cells
+            if cells:
+                cell = rng.choice(cells)  # drawn before the value, as in GridEngine.spawn
+                board.flat[cell] = 2 if rng.random() < 0.9 else 4
+            boards[game] = board
+            moves[game] += 1
+            still_playing.append(game)
+        playing = still_playing
+    return [(int(board.max()), count) for board, count in zip(boards, moves)]
+
+
+def play_chunk(rows, cols, policy_name, seeds, max_moves):
+    """
+    Worker entry point, plays one game per seed
+    Returns a list of (largest tile, number of moves)
+    """
+    game_engine = make_engine(rows, cols)
+    if game_engine is not engine and policy_name in MASK_POLICIES:
+        rngs = [random.Random(seed) for seed in seeds]
+        return play_batch(game_engine, MASK_POLICIES[policy_name], rngs, max_moves)
+    policy = load_policy(policy_name)
+    return [play(game_engine, policy, random.Random(seed), max_moves) for seed in seeds]
+
+
+def run(games, rows=4, cols=4, policy_name='random', workers=None, chunksize=256, seed=None, max_moves=None):
+    """
+    Play games over a process pool, game i is seeded from seed and i
+    Returns a list of (largest tile, number of moves) in game order
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    workers = workers or os.cpu_count() or 1
+    seeds = [seed * 1000003 + index for index in range(games)]
+    chunks = [seeds[start:start + chunksize] for start in range(0, games, chunksize)]
+
+    if workers == 1:
+        results = [play_chunk(rows, cols, policy_name, chunk, max_moves) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_chunk, rows, cols, policy_name, chunk, max_moves)
+                       for chunk in chunks]
+            results = [future.result() for future in futures]
+    return [game for chunk in results for game in chunk]
+
+
+def report(games, elapsed, target=sys.stdout):
+    """
+    Print the largest tile distribution, move statistics and throughput
+    """
+    count = len(games)
+    tiles = Counter(tile for tile, dummy_moves in games)
+    moves = sorted(moves for dummy_tile, moves in games)
+    width = max(tiles.values())
+
+    print("{:>12} {:>11} {:>6}  {:>7}".format('largest tile', 'games', 'share', 'reached'), file=target)
+    reached = count
+    for tile in sorted(tiles):
+        bar = '#' * max(1, round(40 * tiles[tile] / width))
+        print("{:>12} {:>11} {:6.2%}  {:7.2%}  {}".format(
+            tile, tiles[tile], tiles[tile] / count, reached / count, bar), file=target)
+        reached -= tiles[tile]
+    print("moves: mean {:.1f}, median {}, min {}, max {}".format(
+        sum(moves) / count, moves[count // 2], moves[0], moves[-1]), file=target)
+    print("{} games in {:.2f} seconds, {:.0f} games/second, {:.0f} moves/second".format(
+        count, elapsed, count / elapsed, sum(moves) / elapsed), file=target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play 2048 headlessly and report statistics.")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--rows', type=int, default=4)
+    parser.add_argument('--cols', type=int, default=4)
+    parser.add_argument('--policy', default='random',
+                        help="random, corner, expectimax, ntuple or module:function")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes")
+    parser.add_argument('--chunksize', type=int, default=256, help="games per task")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-moves', type=int, default=None, help="stop every game after this many moves")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    games = run(args.games, args.rows, args.cols, args.policy, args.workers, args.chunksize,
+                args.seed, args.max_moves)
+    report(games, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Smoke tests of the kivy view, skipped where kivy and kivymd are not installed
+"""
+
+import importlib
+import os
+
+import pytest
+
+pytest.importorskip('kivy')
+pytest.importorskip('kivymd')
+
+import engine
+import game
+import record
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def view(tmp_path, monkeypatch):
+    """
+    The 2048.py module, run from its folder (assets are found relative to it)
+    and recording its games in a temporary folder
+    """
+    monkeypatch.chdir(HERE)
+    module = importlib.import_module('2048')
+    monkeypatch.setattr(module, 'record_dir', str(tmp_path))
+    return module
+
+
+def test_board_builds(view):
+    board = view.Board()
+    assert isinstance(board.game, game.Game)
+    assert board.game.empty_count == board.rows * board.cols - 2
+    board.recorder.close()
+
+
+def test_app_closes_record(view, tmp_path):
+    from kivy.core.text import LabelBase
+    from kivy.lang import Builder
+    for name, font in (('perpeta', 'perpeta.ttf'), ('Lato', 'Lato-Regular.ttf'), ('OpenSans', 'OpenSans-Regular.ttf')):
+        LabelBase.register(name=name, fn_regular='../assets/' + font)
+    Builder.load_file('2048.kv')
+    try:
+        app = view.Game()
+        app.root = app.build()
+        board = app.root.ids.board
+        board.slide_duration = 0
+        direction = engine.directions_of(board.game.legal_moves())[0]
+        board.move(direction)  # two initial tiles and a move, the last event is half a pair
+        app.on_stop()
+    finally:
+        Builder.unload_file('2048.kv')
+
+    path, = tmp_path.iterdir()
+    replayed = record.replay(str(path), verify=True)
+    assert replayed.moves == 1
+    assert replayed.board == board.game.board
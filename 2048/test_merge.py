@@ -0,0 +1,17 @@
+"""
+Differential test of the merge kernels against legacy_merge, see merge.check
+"""
+
+import merge
+
+
+def test_merge_agrees_with_legacy():
+    assert merge.check(5) == sum(5 ** length for length in range(6))
+
+
+def test_merge_table_agrees_with_legacy():
+    # length-4 lines are computed on first sight and read from the table afterwards,
+    # the second pass checks what the table holds, up to the largest bitboard tile
+    values = (0, 2, 1024, 2048, 32768)
+    for dummy_pass in range(2):
+        assert merge.check(4, values) == sum(5 ** length for length in range(5))
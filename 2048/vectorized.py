@@ -0,0 +1,120 @@
+"""
+NumPy move kernel for 2048 boards of any shape, kept free of kivy
+Every row of every board slides at once: tiles are compacted towards the start of the
+line with a stable sort, equal neighbours are paired up by their parity inside each run
+of equal values (the same greedy left to right pairing as engine.merge), and the line
+is compacted once more after the merges.
+
+move_batch takes a stack of boards of shape [B, rows, cols] (or a single board) and
+returns all of them moved in a single call, which is how simulate.py plays a chunk of
+random or corner games on a grid at once.
+
+Usage: python vectorized.py ROWS COLS [BATCH]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import engine
+
+
+def _compact(lines):
+    # move the non-empty cells to the front, keeping their order
+    order = np.argsort(lines == 0, axis=-1, kind='stable')
+    return np.take_along_axis(lines, order, axis=-1)
+
+
+def merge_lines(lines):
+    """
+    Merge every line of a 2-d array towards index 0
+    Returns a new array of the same shape
+    """
+    lines = _compact(lines)
+    length = lines.shape[-1]
+    if length < 2:
+        return lines
+
+    # position of every cell inside its run of equal values
+    index = np.arange(length)
+    starts = np.ones(lines.shape, dtype=bool)
+    starts[:, 1:] = lines[:, 1:] != lines[:, :-1]
+    run_start = np.maximum.accumulate(np.where(starts, index, 0), axis=-1)
+    absorbed = ((index - run_start) % 2 == 1) & (lines != 0)  # odd cells merge into their left neighbour
+
+    merged = lines.copy()
+    merged[:, :-1] += lines[:, :-1] * absorbed[:, 1:]
+    merged[absorbed] = 0
+    return _compact(merged)
+
+
+def move_batch(boards, direction):
+    """
+    Slide all tiles of a stack of boards (shape [..., rows, cols]) towards one of 'u', 'd', 'l', 'r'
+    Returns a new array of the same shape
+    """
+    boards = np.asarray(boards)
+    assert direction in engine.DIRECTIONS, "unknown direction: " + str(direction)
+
+    # turn the move into a left move on the last axis
+    view = boards
+    if direction in 'ud':
+        view = np.swapaxes(view, -1, -2)
+    if direction in 'dr':
+        view = view[..., ::-1]
+    shape = view.shape
+    moved = merge_lines(view.reshape(-1, shape[-1])).reshape(shape)
+
+    if direction in 'dr':
+        moved = moved[..., ::-1]
+    if direction in 'ud':
+        moved = np.swapaxes(moved, -1, -2)
+    return np.ascontiguousarray(moved)
+
+
+def make_engine(rows, cols):
+    """
+    The fastest engine for a board shape: the bitboard for 4x4, the pure Python grid
+    otherwise. Since merge works in one pass, a single board moves faster in Python
+    than through a NumPy call at every size measured (up to 24x24), the kernel only
+    pays off on batches
+    Returns an engine
+    """
+    if (rows, cols) == (engine.ROWS, engine.COLS):
+        return engine
+    return engine.GridEngine(rows, cols)
+
+
+if __name__ == '__main__':
+    rows, cols = int(sys.argv[1]), int(sys.argv[2])
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    rng = np.random.default_rng(0)
+    boards = rng.choice([0, 0, 0, 2, 4, 8, 16], size=(batch, rows, cols))
+    grid = engine.GridEngine(rows, cols)
+    tuples = [tuple(map(tuple, board)) for board in boards.tolist()]
+
+    for direction in engine.DIRECTIONS:
+        moved = move_batch(boards, direction)
+        for result, board in zip(moved.tolist(), tuples):
+            assert tuple(map(tuple, result)) == grid.move(board, direction), "kernel differs from merge"
+
+    start = time.perf_counter()
+    for direction in engine.DIRECTIONS:
+        for board in tuples:
+            grid.move(board, direction)
+    python_rate = 4 * batch / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for direction in engine.DIRECTIONS:
+        move_batch(boards, direction)
+    numpy_rate = 4 * batch / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for direction in engine.DIRECTIONS:
+        for board in boards[:200]:
+            move_batch(board, direction)
+    single_rate = 4 * len(tuples[:200]) / (time.perf_counter() - start)
+
+    print("{}x{}: python {:.0f} moves/s, numpy batch {:.0f} moves/s, numpy one board {:.0f} moves/s".format(
+        rows, cols, python_rate, numpy_rate, single_rate))
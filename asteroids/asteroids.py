@@ -6,7 +6,9 @@ Config.set('graphics', 'resizable', False)
 Config.set('graphics', 'width', 600)
 Config.set('graphics', 'height', 800)
 
+import os
 import random
+import time
 from functools import partial
 from kivy.clock import Clock
 from kivy.core.text import LabelBase
@@ -20,11 +22,18 @@ from kivy.properties import (
 from kivy.uix.label import Label
 from kivy.uix.widget import Widget
 from kivy.uix.screenmanager import Screen, ScreenManager, WipeTransition
-from kivy.vector import Vector
 from kivymd.app import MDApp
 from kivymd.uix.button import MDRectangleFlatButton
 from kivymd.uix.picker import MDTimePicker
 
+import broadphase
+from motion import Motion
+from pool import Pool
+import textures
+import world
+
+record_dir = "records"  # every session's input is recorded here, replay with: python world.py replay FILE
+
 
 def collide_1_1(spr1, spr2):
     """
@@ -47,13 +56,31 @@ def collide_9_9(spr_list1, spr_list2):
     """
     Check if any pair of sprite widgets have collided (one from each list).
     """
-    for spr in spr_list1:
-        collided, spr1, spr2 = collide_1_9(spr, spr_list2)
-        if collided:
-            return collided, spr1, spr2
+    pairs = collide_all(spr_list1, spr_list2)
+    if pairs:
+        return True, pairs[0][0], pairs[0][1]
     return False, None, None
 
 
+def collide_all(spr_list1, spr_list2, grid=None):
+    """
+    Find every pair of collided sprite widgets (one from each list), not just the first one.
+    The second list is filed in a spatial hash, so each sprite is only tested against its neighbors.
+    """
+    return broadphase.collide_pairs(spr_list1, spr_list2, grid)
+
+
+# sprite pools: how many sprites of each model are built up front, and what to do once all are in use
+POOLS = {
+    'cannon': (64, 'recycle'),  # the oldest cannon in flight is nearly out of the screen anyway
+    'meteorite1': (8, 'grow'),
+    'meteorite2': (8, 'grow'),
+    'saturn': (8, 'grow'),
+    'ufo': (8, 'grow'),
+    'missile': (8, 'grow'),
+}
+
+
 class Sprite(Widget):
     """
     A general class for rock, missile, meteorite, ufo, bonus and cannon objects
@@ -65,47 +92,36 @@ class Sprite(Widget):
     velocity = ReferenceListProperty(vel_x, vel_y)
     angle = NumericProperty(0)  # for rotation
 
-    __source = {
-        'cannon': '../assets/cannon.png',
-        'bonus': '../assets/bonus.png',
-        'missile': '../assets/missile.png',
-        'meteorite1': '../assets/meteorite1.png',
-        'meteorite2': '../assets/meteorite2.png',
-        'saturn': '../assets/saturn.png',
-        'ufo': '../assets/ufo2.png'
+    __source = {  # image of each model, see textures.IMAGES
+        'cannon': 'cannon',
+        'bonus': 'bonus',
+        'missile': 'missile',
+        'meteorite1': 'meteorite1',
+        'meteorite2': 'meteorite2',
+        'saturn': 'saturn',
+        'ufo': 'ufo2'
     }
 
     def __init__(self, model, pos, size, **kwargs):
         super().__init__(**kwargs)
-        self.model = model
+        self.kind = model  # the pool it belongs to, even after it has revived as a bonus
+        self.motion = None  # the motion arrays the sprite is moved by, once on the screen
+        self.slot = None
+        self.spawn(pos, size)
+
+    def spawn(self, pos, size):
+        """
+        Arm the sprite as a fresh object of its kind, whether it is new or comes back from a pool.
+        """
+        self.model = self.kind
         self.pos = pos
         self.size = size
+        self.hp = 0
+        self.angle = 0
+        self.opacity = 1
         self.exploded = False
-        self.spawn()
-        Clock.schedule_interval(self.move, 1 / 60)
-
-    def spawn(self):
-        self.source = Sprite.__source[self.model]
-
-        # the raider fires a cannon that flies directly upward very fast
-        if self.model == 'cannon':
-            self.vel_x = 0
-            self.vel_y = 15
-
-        # the bonus moves downward at a random angle, but is quite slow
-        elif self.model == 'bonus':
-            self.velocity = Vector(1, 1).rotate(random.randint(135, 315))  # 135~315: downward
-
-        # heavy sprite object falls down at a steeper angle, slow but hard to destroy (high hp)
-        elif self.model in ('saturn', 'meteorite1', 'meteorite2'):
-            self.hp = 3
-            self.velocity = Vector(2, 2).rotate(random.randint(205, 245))  # 205~245: steep
-
-        # enemy aircrafts make fast and aggressive moves, very dangerous, but vulnerable (low hp)
-        elif self.model in ('ufo', 'missile'):
-            self.hp = 2
-            self.vel_x = 0
-            self.vel_y = -5
+        self.source = textures.source(Sprite.__source[self.model])
+        self.hp, self.vel_x, self.vel_y = world.launch(self.model, random)  # see the rules in world.py
 
     def revive(self):
         """
@@ -114,46 +130,47 @@ class Sprite(Widget):
         The sprite revives at exactly the same position where it died, so self.pos does not update.
         """
         self.model = 'bonus'
-        self.source = '../assets/bonus.png'
+        self.source = textures.source('bonus')
         self.angle = 0
-        self.size = 80, 80
-        self.velocity = Vector(2, 2).rotate(random.randint(0, 360))  # downward only
+        self.size = world.BONUS_SIZE
+        self.velocity = world.revive_velocity(random)
+        self.sync()
 
     def explode(self):
         if self.model != 'bonus':
-            self.source = '../assets/explosion.png'
-            self.size = 100, 100
+            self.source = textures.source('explosion')
+            self.size = world.EXPLOSION_SIZE
         else:
-            self.source = '../assets/galaxy2.png'
+            self.source = textures.source('galaxy2')
 
         self.angle = 0
         self.vel_x = 0
         self.vel_y = 0
         self.exploded = True
+        self.sync()
 
-    def move(self, interval):
-        # a bonus sprite bounces off left and right
-        if self.model == 'bonus':
-            if self.exploded:
-                self.opacity -= 0.02  # gradually fade away
-            elif self.x <= 0 or (self.x >= 600 - self.size[0]):
-                self.vel_x *= -1
-
-        # meteorites rotate while moving
-        if self.model in ('meteorite1', 'meteorite2'):
-            if self.exploded:
-                self.opacity -= 0.02  # gradually fade away
-            else:
-                self.angle += 2
-
-        if self.model in ('ufo', 'missile', 'saturn') and self.exploded:
-            self.opacity -= 0.02  # gradually fade away
+    def attach(self, motion):
+        """
+        Hand the sprite over to the motion arrays of the screen, which move it from now on.
+        """
+        spin, fade, bounce = world.effects(self.model, self.exploded)
+        self.motion = motion
+        motion.add(self, x=self.x, y=self.y, vx=self.vel_x, vy=self.vel_y, width=self.width,
+                   angle=self.angle, opacity=self.opacity, spin=spin, fade=fade, bounce=bounce)
 
-        if self.model == 'static':
-            return False  # for static sprite, cancel the clock schedule
+    def detach(self):
+        if self.motion is not None:
+            self.motion.remove(self)
+            self.motion = None
 
-        # universal update function
-        self.pos = Vector(*self.velocity) + self.pos
+    def sync(self):
+        """
+        Copy a change of velocity, size or model into the motion arrays (the position is kept).
+        """
+        if self.motion is not None:
+            spin, fade, bounce = world.effects(self.model, self.exploded)
+            self.motion.set(self, vx=self.vel_x, vy=self.vel_y, width=self.width, angle=self.angle,
+                            spin=spin, fade=fade, bounce=bounce)
 
 
 class Raider(Widget):
@@ -164,10 +181,8 @@ class Raider(Widget):
         self.offset_x = None  # distance from the mouse touch point
         self.offset_y = None
 
-    def shoot(self):
-        size = (20, 40)
-        pos = self.pos[0] + 154 / 3 - size[0] / 2, self.pos[1] + 224 / 2 + 30 - size[1] / 2
-        missile = Sprite(model='cannon', pos=pos, size=size)
+    def shoot(self, pool):
+        missile = pool.acquire(world.cannon_position(*self.pos), world.CANNON_SIZE)
         return missile
 
 
@@ -194,28 +209,45 @@ class Space(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         Window.bind(on_key_down=self.on_key_down)
-        Clock.schedule_interval(self.tick, 0.2)
-        Clock.schedule_interval(self.spawn_enemies, 0.2)
-        Clock.schedule_interval(self.garbage_collect, 1 / 60)
+        Clock.schedule_interval(self.update, 0)  # every frame
+
+        # one fixed-timestep loop moves all sprites, instead of a clock event per sprite,
+        # and the timer, enemies and collisions follow its steps exactly as world.World does
+        self.motion = Motion(field_width=600)
 
         # list of sprite objects
         self.bonus = []
         self.cannons = []
         self.enemies = []  # meteorites, saturn, ufos and missiles...
+        self.explosions = []  # dead sprites fading away
+        self.grid = broadphase.SpatialHash(600, 800)  # reused by every collision check
+
+        # sprites are built once and reused, removed ones are parked off the widget tree
+        self.pools = {}
+        for model, (capacity, policy) in POOLS.items():
+            self.pools[model] = Pool(partial(Sprite, model), capacity, policy, reclaim=self.reclaim)
+            self.pools[model].fill((0, 0), (0, 0))
+
+        # the session is seeded and its input recorded, so that it can be played again without a window
+        self.seed = random.SystemRandom().getrandbits(32)
+        random.seed(self.seed)
+        os.makedirs(record_dir, exist_ok=True)
+        path = os.path.join(record_dir, "{}-{}.replay".format(time.strftime("%Y%m%d-%H%M%S"), self.seed))
+        self.recorder = world.Recorder(path, self.seed)
 
         self.time_dialog = MDTimePicker()  # test
 
-    def tick(self, interval):
-        if self.in_play:
-            self.timer += 1
-            self.shield_time += 1
-            self.time_label = self.format_time()
-            self.rgba_label = self.format_rgba()
-            if __debug__:  # this will be called by running `python -O asteroids.py` on the command line
-                # make sure that objects are garbage collected
-                print(len(self.bonus))
-                print(len(self.cannons))
-                print(len(self.enemies))
+    def tick(self):
+        self.timer += 1
+        self.shield_time += 1
+        self.time_label = self.format_time()
+        self.rgba_label = self.format_rgba()
+        if __debug__:  # this will be called by running `python -O asteroids.py` on the command line
+            # make sure that objects are garbage collected
+            print(len(self.bonus))
+            print(len(self.cannons))
+            print(len(self.enemies))
+            print(len(self.explosions))
 
     def format_time(self):
         hour = self.timer // 3600
@@ -229,46 +261,83 @@ class Space(Screen):
             return 1, 1, 0, 1
         return 1, 1, 1, 0
 
-    def spawn_enemies(self, interval):
-        if self.in_play:
-            if self.timer % 5 == 0:  # every second
-                menu = ['meteorite1', 'meteorite2', 'saturn', 'ufo', 'missile']
-                model = random.choice(menu)
-
-                if model == 'missile':
-                    size = (90, 120)
-                elif model == 'saturn':
-                    size = (140, 70)
-                elif model == 'ufo':
-                    size = (110, 110 / 1.77)
-                else:
-                    size = (75, 100)
-
-                pos = random.randint(int(size[0] / 2), int(self.size[0] - size[0] * 1.5)), self.size[1]
-                enemy = Sprite(model=model, pos=pos, size=size)
+    def spawn_enemies(self):
+        if self.timer % world.SPAWN_TICKS == 0:  # every second
+            model = random.choice(world.ENEMIES)
+            size = world.ENEMY_SIZES[model]
+            pos = world.enemy_position(size, random, *self.size)
+            enemy = self.pools[model].acquire(pos, size)
+            if enemy is not None:
                 self.enemies.append(enemy)
-                self.add_widget(enemy)
+                self.add_sprite(enemy)
+
+    def add_sprite(self, spr):
+        self.add_widget(spr)
+        spr.attach(self.motion)
 
     def clear_sprite(self, *args, spr=None):
+        spr.detach()
         self.remove_widget(spr)
+        self.pools[spr.kind].release(spr)
 
-    def garbage_collect(self, interval):
+    def reclaim(self, spr):
         """
-        Check boundaries and collisions, so as to remove dead widgets on a regular basis.
-        Free resources periodically to prevent memory overload and make the game smooth.
+        Take a sprite out of play before its pool hands it out again.
+        """
+        for group in (self.cannons, self.enemies, self.bonus, self.explosions):
+            if spr in group:
+                group.remove(spr)
+        self.clear_sprite(spr=spr)
+
+    def update(self, interval):
+        """
+        Advance the world by as many fixed steps as the frame holds, then draw every sprite in
+        between the last two steps. The cost of a frame only depends on the sprites alive, dead
+        ones are out of the arrays.
         """
         if not self.in_play:
             return
 
+        motion = self.motion
+        motion.advance(interval, self.fixed_step)
+        xs, ys, angles, opacities = motion.interpolated()
+        for spr, x, y, angle, opacity in zip(motion.owners, xs, ys, angles, opacities):
+            spr.pos = x, y
+            spr.angle = angle
+            spr.opacity = opacity
+
+    def fixed_step(self):
+        """
+        Everything that follows a step of the motion arrays, in the order of world.World.step:
+        tick the timer and spawn enemies when due, then check boundaries and collisions where
+        the step left the sprites, not where they are drawn. A recorded session thus plays
+        the same in world.py, hit for hit.
+        """
+        motion = self.motion
+        for spr, x, y, opacity in zip(motion.owners, *motion.current()):
+            spr.pos = x, y
+            spr.opacity = opacity
+
+        if motion.steps % world.TICK_STEPS == 0:  # every 0.2 seconds
+            self.tick()
+            self.spawn_enemies()
+        self.garbage_collect()
+
+    def garbage_collect(self):
+        """
+        Check boundaries and collisions, so as to remove dead widgets on a regular basis.
+        Free resources periodically to prevent memory overload and make the game smooth.
+        """
         for wid in self.cannons.copy():
             if self.out_of_bound(wid):
                 self.cannons.remove(wid)
-                self.remove_widget(wid)
+                self.clear_sprite(spr=wid)
 
+        targets = []  # enemies still alive after this pass
         for wid in self.enemies.copy():
             if self.out_of_bound(wid):
                 self.enemies.remove(wid)
-                self.remove_widget(wid)
+                self.clear_sprite(spr=wid)
 
             elif wid.hp <= 0:
                 self.enemies.remove(wid)
@@ -277,30 +346,38 @@ class Space(Screen):
                     self.bonus.append(wid)
                 else:
                     wid.explode()  # explosion effect (takes around 0.5 ~ 1 seconds)
-                    callback = partial(self.clear_sprite, spr=wid)  # partial function
-                    Clock.schedule_once(callback, timeout=2)  # remove widget after 2 seconds
+                    self.explosions.append(wid)  # removed once it has faded away
             else:
-                collided, enemy, cannon = collide_1_9(wid, self.cannons)
-                if collided:
-                    self.remove_widget(cannon)
-                    self.cannons.remove(cannon)
-                    enemy.hp -= 1
-                    self.score += 1
+                targets.append(wid)
+
+        # a cannon is spent on the first enemy it hits, but an enemy can take several hits at once
+        spent = set()
+        for enemy, cannon in collide_all(targets, self.cannons, self.grid):
+            if cannon not in spent:
+                spent.add(cannon)
+                self.clear_sprite(spr=cannon)
+                self.cannons.remove(cannon)
+                enemy.hp -= 1
+                self.score += 1
+
+        for wid in self.explosions.copy():
+            if wid.opacity <= 0:
+                self.explosions.remove(wid)
+                self.clear_sprite(spr=wid)
 
         for wid in self.bonus.copy():
             if wid.y < -150 or wid.y > self.size[1]:  # bonus escapes the top or bottom
                 self.bonus.remove(wid)
-                self.remove_widget(wid)
+                self.clear_sprite(spr=wid)
 
             elif collide_1_1(wid, self.raider):
                 self.bonus.remove(wid)
 
                 wid.explode()  # explosion effect (takes around 0.5 ~ 1 seconds)
-                callback = partial(self.clear_sprite, spr=wid)  # partial function
-                Clock.schedule_once(callback, timeout=2)  # remove widget after 2 seconds
+                self.explosions.append(wid)  # removed once it has faded away
 
-                self.score += 1000  # bonus score
-                self.shield_time = 20000  # add protection shield
+                self.score += world.BONUS_SCORE  # bonus score
+                self.shield_time = world.SHIELD_TIME  # add protection shield
 
     def out_of_bound(self, spr):
         """
@@ -358,6 +435,7 @@ class Space(Screen):
                                        self.width - self.raider.size[0] / 2)
             self.raider.center_y = min(max(touch.y + self.raider.offset_y, self.raider.size[1] / 2),
                                        self.width - self.raider.size[1] / 2)
+            self.recorder.add(self.motion.steps, 'move', self.raider.center_x, self.raider.center_y)
 
     def switch_screen(self, *args):
         # clear the pause widgets before switch
@@ -417,9 +495,11 @@ class Space(Screen):
     def on_key_down(self, window, key, *args):
         if key == Keyboard.keycodes['spacebar']:
             if self.in_play:
-                missile = self.raider.shoot()
-                self.cannons.append(missile)
-                self.add_widget(missile)
+                self.recorder.add(self.motion.steps, 'fire')
+                missile = self.raider.shoot(self.pools['cannon'])
+                if missile is not None:
+                    self.cannons.append(missile)
+                    self.add_sprite(missile)
         elif key == Keyboard.keycodes['enter']:
             if self.in_play:
                 self.pause()
@@ -440,8 +520,13 @@ class Game(MDApp):
         self.theme_cls.primary_hue = "600"
         return Root()
 
+    def on_stop(self):
+        space = self.root.get_screen('space')
+        space.recorder.close(space.motion.steps)
+
 
 if __name__ == '__main__':
+    textures.build()  # pack the sprite images into one texture, only when they have changed
     Builder.load_file('asteroids.kv')
 
     LabelBase.register(name='perpeta', fn_regular='../assets/perpeta.ttf')
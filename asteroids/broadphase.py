@@ -0,0 +1,115 @@
+"""
+Uniform grid broadphase for sprite collisions, kept free of kivy
+The playfield is cut into square cells and every box of one group is filed under each
+cell it touches, so a box of the other group is only tested against the boxes filed
+under its own cells instead of the whole group. Boxes reaching outside the playfield
+are clamped to the border cells: nothing is ever missed, it is only tested more often.
+
+A box is anything with x, y, width and height, like a kivy widget, and two boxes
+collide when they overlap or touch, the same test as Widget.collide_widget.
+"""
+
+WIDTH = 600
+HEIGHT = 800
+CELL_SIZE = 128  # about the size of the largest enemy, so a box spans 1 to 4 cells
+
+
+def overlap(box1, box2):
+    """
+    Check if two boxes overlap or touch
+    Returns a boolean
+    """
+    return not (box1.x + box1.width < box2.x or box1.x > box2.x + box2.width or
+                box1.y + box1.height < box2.y or box1.y > box2.y + box2.height)
+
+
+class SpatialHash:
+    """
+    A uniform grid over the playfield, each cell holding the indices of the boxes touching it
+    The grid is rebuilt from scratch every frame, which costs less than tracking moves
+    """
+
+    def __init__(self, width=WIDTH, height=HEIGHT, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cols = max(1, -(-int(width) // cell_size))
+        self.rows = max(1, -(-int(height) // cell_size))
+        self.cells = [[] for dummy in range(self.cols * self.rows)]
+        self.boxes = []
+
+    def _span(self, box):
+        """
+        Range of cells covered by a box, clamped to the grid
+        Returns (first col, last col, first row, last row)
+        """
+        size, last_col, last_row = self.cell_size, self.cols - 1, self.rows - 1
+        col1 = min(max(int(box.x // size), 0), last_col)
+        col2 = min(max(int((box.x + box.width) // size), 0), last_col)
+        row1 = min(max(int(box.y // size), 0), last_row)
+        row2 = min(max(int((box.y + box.height) // size), 0), last_row)
+        return col1, col2, row1, row2
+
+    def clear(self):
+        for cell in self.cells:
+            cell.clear()
+        self.boxes.clear()
+
+    def insert(self, box):
+        index = len(self.boxes)
+        self.boxes.append(box)
+        col1, col2, row1, row2 = self._span(box)
+        for row in range(row1, row2 + 1):
+            base = row * self.cols
+            for col in range(col1, col2 + 1):
+                self.cells[base + col].append(index)
+
+    def build(self, boxes):
+        """
+        File a whole group of boxes, forgetting the previous ones
+        """
+        self.clear()
+        for box in boxes:
+            self.insert(box)
+
+    def candidates(self, box):
+        """
+        Indices of the filed boxes sharing a cell with box, possibly colliding
+        Returns a sorted list
+        """
+        col1, col2, row1, row2 = self._span(box)
+        cells = self.cells
+        if col1 == col2 and row1 == row2:
+            return cells[row1 * self.cols + col1]
+        found = set()
+        for row in range(row1, row2 + 1):
+            base = row * self.cols
+            for col in range(col1, col2 + 1):
+                found.update(cells[base + col])
+        return sorted(found)
+
+    def query(self, box):
+        """
+        The filed boxes colliding with box
+        Returns a list, in the order the boxes were filed
+        """
+        boxes = self.boxes
+        return [boxes[index] for index in self.candidates(box) if overlap(box, boxes[index])]
+
+
+def collide_pairs(boxes1, boxes2, grid=None):
+    """
+    Every pair of colliding boxes, one from each group, a grid can be passed in to be reused
+    The smaller group is filed and the other one queried
+    Returns a list of (box1, box2), ordered as the boxes appear in boxes1, then in boxes2
+    """
+    if not boxes1 or not boxes2:
+        return []
+    grid = SpatialHash() if grid is None else grid
+    if len(boxes2) <= len(boxes1):
+        grid.build(boxes2)
+        return [(box1, box2) for box1 in boxes1 for box2 in grid.query(box1)]
+
+    grid.build(boxes1)
+    pairs = [(index1, index2) for index2, box2 in enumerate(boxes2)
+             for index1 in grid.candidates(box2) if overlap(boxes1[index1], box2)]
+    pairs.sort()
+    return [(boxes1[index1], boxes2[index2]) for index1, index2 in pairs]
@@ -0,0 +1,151 @@
+"""
+Fixed-timestep motion of every live sprite, kept free of kivy
+Positions, velocities and the per-step effects of all sprites (rotation, fading,
+bouncing off the side walls) live in parallel NumPy arrays and the whole world is
+advanced in a handful of array operations per step. Live sprites are packed in the
+first count slots, removing one moves the last one into its slot, so a step costs
+the same however many sprites have come and gone before.
+
+Frames of any length are turned into steps of exactly STEP seconds by an accumulator,
+and the time left over is used to blend the last two steps, so the sprites are drawn
+where they are between two steps instead of jumping from one to the next.
+"""
+
+import numpy as np
+
+STEP = 1 / 60
+MAX_STEPS = 5  # steps per frame at most, a longer stall is dropped instead of caught up
+WIDTH = 600  # sprites bounce off x = 0 and x = WIDTH - width
+
+FIELDS = ('x', 'y', 'vx', 'vy', 'angle', 'spin', 'opacity', 'fade', 'width')
+TELEPORT = {'x': 'prev_x', 'y': 'prev_y', 'angle': 'prev_angle'}  # fields that are blended
+
+
+class Motion:
+    """
+    Structure of arrays for the motion of live sprites, each owner knows its slot
+    """
+
+    def __init__(self, capacity=256, field_width=WIDTH):
+        self.field_width = field_width
+        self.count = 0
+        self.owners = []  # owners[slot].slot == slot for every live slot
+        self.accumulator = 0.0
+        self.steps = 0  # steps made since the start
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """
+        Create the arrays, or grow them to a new capacity keeping the live slots
+        """
+        for name in FIELDS + tuple(TELEPORT.values()):
+            array = np.zeros(capacity)
+            if hasattr(self, name):
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        bounce = np.zeros(capacity, dtype=bool)
+        if hasattr(self, 'bounce'):
+            bounce[:self.count] = self.bounce[:self.count]
+        self.bounce = bounce
+        self.capacity = capacity
+
+    def add(self, owner, **values):
+        """
+        Give an owner a slot and set its fields, the others default to 0 (opacity to 1)
+        """
+        if self.count == self.capacity:
+            self._allocate(2 * self.capacity)
+        slot = self.count
+        self.count += 1
+        self.owners.append(owner)
+        owner.slot = slot
+        for name in FIELDS:
+            getattr(self, name)[slot] = 1.0 if name == 'opacity' else 0.0
+        self.bounce[slot] = False
+        self.set(owner, **values)
+
+    def remove(self, owner):
+        """
+        Free the slot of an owner, the last live slot takes its place
+        """
+        slot = getattr(owner, 'slot', None)
+        if slot is None:
+            return
+        last = self.count - 1
+        if slot != last:
+            for name in FIELDS + tuple(TELEPORT.values()) + ('bounce',):
+                array = getattr(self, name)
+                array[slot] = array[last]
+            moved = self.owners[last]
+            self.owners[slot] = moved
+            moved.slot = slot
+        self.owners.pop()
+        self.count = last
+        owner.slot = None
+
+    def set(self, owner, **values):
+        """
+        Overwrite some fields of an owner, a new position or angle is not blended with the old one
+        """
+        slot = owner.slot
+        for name, value in values.items():
+            getattr(self, name)[slot] = value
+            if name in TELEPORT:
+                getattr(self, TELEPORT[name])[slot] = value
+
+    def step(self):
+        """
+        Advance every live sprite by one step
+        """
+        n = self.count
+        x, y, vx = self.x[:n], self.y[:n], self.vx[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        self.prev_angle[:n] = self.angle[:n]
+
+        # bouncing sprites turn back when they touch a side wall
+        walls = self.bounce[:n] & ((x <= 0) | (x >= self.field_width - self.width[:n]))
+        vx[walls] *= -1
+
+        x += vx
+        y += self.vy[:n]
+        self.angle[:n] += self.spin[:n]
+        self.opacity[:n] -= self.fade[:n]
+        self.steps += 1
+
+    def advance(self, interval, on_step=None):
+        """
+        Add the time of a frame to the accumulator and make as many whole steps as it holds,
+        calling on_step() after each of them
+        Returns the number of steps made
+        """
+        self.accumulator += interval
+        steps = 0
+        while self.accumulator >= STEP and steps < MAX_STEPS:
+            self.step()
+            if on_step is not None:
+                on_step()
+            self.accumulator -= STEP
+            steps += 1
+        if steps == MAX_STEPS:
+            self.accumulator %= STEP
+        return steps
+
+    def current(self):
+        """
+        Where the last step left the sprites, exactly
+        Returns lists (x, y, opacity) in slot order, the order of self.owners
+        """
+        n = self.count
+        return self.x[:n].tolist(), self.y[:n].tolist(), self.opacity[:n].tolist()
+
+    def interpolated(self):
+        """
+        Blend the last two steps by the fraction of a step left in the accumulator
+        Returns lists (x, y, angle, opacity) in slot order, the order of self.owners
+        """
+        n, alpha = self.count, self.accumulator / STEP
+        x = self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha
+        y = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha
+        angle = self.prev_angle[:n] + (self.angle[:n] - self.prev_angle[:n]) * alpha
+        return x.tolist(), y.tolist(), angle.tolist(), self.opacity[:n].tolist()
@@ -0,0 +1,72 @@
+"""
+Object pools, kept free of kivy
+A pool hands out objects of one kind and takes them back when they leave the game, so
+the same objects are used again and again instead of being built and thrown away. An
+object coming back into play is re-armed by its spawn method, called with the same
+arguments the factory would have been called with.
+
+Once capacity objects exist and all of them are in use, the policy decides:
+    'grow'     build one more anyway
+    'drop'     refuse, acquire returns None
+    'recycle'  take back the object in use for the longest time and hand it out again,
+               reclaim is called on it first so that its owner lets it go
+"""
+
+POLICIES = ('grow', 'drop', 'recycle')
+
+
+class Pool:
+    """
+    Free and active objects of one kind
+    """
+
+    def __init__(self, factory, capacity=32, policy='grow', reclaim=None):
+        assert policy in POLICIES, "unknown pool policy: " + str(policy)
+        assert policy != 'recycle' or reclaim is not None, "a recycling pool needs reclaim"
+        self.factory = factory
+        self.capacity = capacity
+        self.policy = policy
+        self.reclaim = reclaim
+        self.free = []
+        self.active = {}  # objects in use, oldest first
+        self.created = 0
+
+    def _build(self, *args):
+        self.created += 1
+        return self.factory(*args)
+
+    def fill(self, *args):
+        """
+        Build objects ahead of time until capacity of them exist, so none is built in play
+        """
+        while self.created < self.capacity:
+            self.free.append(self._build(*args))
+
+    def acquire(self, *args):
+        """
+        An object ready for play, a free one re-armed by spawn(*args) or a new one factory(*args)
+        Returns the object, or None if all are in use and the policy is 'drop'
+        """
+        if self.free:
+            obj = self.free.pop()
+            obj.spawn(*args)
+        elif self.created < self.capacity or self.policy == 'grow':
+            obj = self._build(*args)
+        elif self.policy == 'drop':
+            return None
+        else:
+            obj = next(iter(self.active))
+            self.reclaim(obj)
+            self.release(obj)  # in case reclaim did not
+            obj = self.free.pop()
+            obj.spawn(*args)
+        self.active[obj] = None
+        return obj
+
+    def release(self, obj):
+        """
+        Take an object back once it has left the game, releasing it twice does nothing
+        """
+        if obj in self.active:
+            del self.active[obj]
+            self.free.append(obj)
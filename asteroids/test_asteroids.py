@@ -0,0 +1,73 @@
+"""
+Replay test of the kivy screen, skipped where kivy and kivymd are not installed
+"""
+
+import importlib
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('kivy')
+pytest.importorskip('kivymd')
+
+import world
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    A built asteroids app, run from its folder (assets are found relative to it)
+    and recording its sessions in a temporary folder
+    """
+    monkeypatch.chdir(HERE)
+    module = importlib.import_module('asteroids')
+    monkeypatch.setattr(module, 'record_dir', str(tmp_path))
+
+    from kivy.core.text import LabelBase
+    from kivy.lang import Builder
+    for name, font in (('perpeta', 'perpeta.ttf'), ('Lato', 'Lato-Regular.ttf'), ('OpenSans', 'OpenSans-Regular.ttf')):
+        LabelBase.register(name=name, fn_regular='../assets/' + font)
+    Builder.load_file('asteroids.kv')
+    try:
+        game = module.Game()
+        game.root = game.build()
+        yield game
+    finally:
+        Builder.unload_file('asteroids.kv')
+
+
+def test_recorded_session_replays(app, tmp_path):
+    from kivy.core.window import Keyboard
+    space = app.root.get_screen('space')
+    space.size = (world.WIDTH, world.HEIGHT)
+    space.in_play = True
+
+    # uneven frames, the raider sweeps the bottom of the screen and fires every few frames
+    rng = random.Random(1)
+    raider = space.raider
+    touch = SimpleNamespace(x=raider.center_x - 5.25, y=raider.center_y - 7.5)
+    space.on_touch_down(touch)
+    for frame in range(2400):
+        if frame % 3 == 0:
+            touch.x = 100 + abs(frame % 800 - 400) + rng.random()
+            space.on_touch_move(touch)
+        if frame % 5 == 0:
+            space.on_key_down(None, Keyboard.keycodes['spacebar'])
+        space.update(rng.uniform(1 / 90, 1 / 30))
+    app.on_stop()
+
+    path, = tmp_path.iterdir()
+    seed, inputs = world.read_replay(str(path))
+    replayed = world.play(world.World(seed), inputs)
+    assert seed == space.seed
+    assert replayed.steps == space.motion.steps
+    assert space.score > 0
+    assert (replayed.score, replayed.timer, replayed.shield_time) == (space.score, space.timer, space.shield_time)
+    motion = space.motion  # the sprites are drawn between two steps, the arrays hold the last one
+    for group in ('cannons', 'enemies', 'bonus', 'explosions'):
+        assert ([(body.model, body.x, body.y) for body in getattr(replayed, group)] ==
+                [(spr.model, motion.x[spr.slot], motion.y[spr.slot]) for spr in getattr(space, group)]), group
@@ -0,0 +1,84 @@
+"""
+Texture atlas of the asteroids sprites
+Every sprite image is packed into one image the first time the game runs (kivy's
+Atlas.create, which needs PIL), and sprites draw regions of it through atlas:// sources.
+All sprites then share a single texture: switching a sprite to its explosion, or drawing
+a screen full of different enemies, never binds another texture, and kivy loads the
+image once for all of them. The atlas is rebuilt whenever an image is newer than it,
+and if it cannot be built at all the sprites fall back to the image files.
+
+Usage: python textures.py    (re)build the atlas ahead of time
+"""
+
+import json
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ASSETS = os.path.join(HERE, os.pardir, 'assets')
+ATLAS = os.path.join(HERE, 'sprites')  # sprites.atlas and its page sprites-0.png
+ATLAS_SIZE = 1024  # all images fit in one page, the largest is the 556 px shield
+
+# every image a sprite or the raider can show, named after its file in the assets folder
+IMAGES = ('cannon', 'bonus', 'missile', 'meteorite1', 'meteorite2', 'saturn', 'ufo2',
+          'explosion', 'galaxy2', 'raider', 'thrust', 'shield')
+
+_atlas = {}
+
+
+def image_path(name):
+    return os.path.join(ASSETS, name + '.png')
+
+
+def is_current():
+    """
+    Check if the atlas exists, holds every image and is newer than all of them
+    Returns a boolean
+    """
+    index = ATLAS + '.atlas'
+    if not os.path.exists(index):
+        return False
+    with open(index) as handle:
+        pages = json.load(handle)
+    if not all(os.path.exists(os.path.join(HERE, page)) for page in pages):
+        return False
+    regions = set()
+    for page in pages.values():
+        regions.update(page)
+    if not regions.issuperset(IMAGES):
+        return False
+    built = os.path.getmtime(index)
+    return all(os.path.getmtime(image_path(name)) <= built for name in IMAGES)
+
+
+def build(force=False):
+    """
+    Pack the images into the atlas unless it is already up to date
+    Returns True if the sprites can draw from the atlas
+    """
+    if force or not is_current():
+        try:
+            from kivy.atlas import Atlas
+            created = Atlas.create(ATLAS, [image_path(name) for name in IMAGES], ATLAS_SIZE)
+        except (ImportError, OSError):  # no PIL, or an unreadable image
+            created = None
+        _atlas['ready'] = bool(created)
+    else:
+        _atlas['ready'] = True
+    return _atlas['ready']
+
+
+def source(name):
+    """
+    Where to draw an image from, a region of the atlas once it is built
+    Returns an atlas:// url, or the path of the image file
+    """
+    if _atlas.get('ready'):
+        return 'atlas://' + ATLAS + '/' + name
+    return image_path(name)
+
+
+if __name__ == '__main__':
+    if build(force=True):
+        print("atlas written to", ATLAS + '.atlas')
+    else:
+        print("atlas could not be built, is PIL installed?")
@@ -0,0 +1,415 @@
+"""
+Headless asteroids, kept free of kivy
+The rules of the game (how enemies are spawned and launched, hit points, score, bonus
+and shield) and a world model that plays them without a window: a seeded random
+stream, a fixed timestep of 1/60 s and input read from a script instead of the mouse
+and keyboard. The same seed and the same input always play the same session, so a
+session can be benchmarked, replayed and profiled.
+
+The kivy screen plays by the same rules and records its input with the seed it played,
+in the replay format below. It ticks, spawns and checks collisions after every step of
+its motion arrays, in the order of World.step, and draws from the same random stream,
+so a session reported from the game is run here again hit for hit.
+
+Replay format, one text line each so that scripts can also be written by hand:
+    ASTEROIDS <version> <seed>
+    <step> fire
+    <step> move <center x> <center y>
+    <step> end
+An input is applied before the step with its number is made.
+
+Usage: python world.py run [--seed S] [--steps N] [--fire-every N] [--output FILE] [--profile]
+       python world.py replay FILE [--profile]
+"""
+
+import argparse
+import cProfile
+import math
+import pstats
+import random
+import time
+
+import broadphase
+
+WIDTH = 600
+HEIGHT = 800
+STEP = 1 / 60  # seconds, the timestep of motion.py
+TICK_STEPS = 12  # the timer ticks every 0.2 s
+SPAWN_TICKS = 5  # an enemy every second
+
+ENEMIES = ('meteorite1', 'meteorite2', 'saturn', 'ufo', 'missile')
+ENEMY_SIZES = {
+    'missile': (90, 120),
+    'saturn': (140, 70),
+    'ufo': (110, 110 / 1.77),
+    'meteorite1': (75, 100),
+    'meteorite2': (75, 100),
+}
+RAIDER_SIZE = (154 / 1.5, 224 / 2 + 30)
+CANNON_SIZE = (20, 40)
+BONUS_SIZE = (80, 80)
+EXPLOSION_SIZE = (100, 100)
+BONUS_SCORE = 1000
+SHIELD_TIME = 20000
+
+MAGIC = 'ASTEROIDS'
+VERSION = 1
+
+
+def rotate(x, y, angle):
+    """
+    Rotate a vector counterclockwise by an angle in degrees, like kivy's Vector.rotate
+    Returns (x, y)
+    """
+    radians = math.radians(angle)
+    cos, sin = math.cos(radians), math.sin(radians)
+    return x * cos - y * sin, x * sin + y * cos
+
+
+def launch(model, rng):
+    """
+    Hit points and velocity of a sprite when it appears
+    Returns (hp, vx, vy)
+    """
+    # the raider fires a cannon that flies directly upward very fast
+    if model == 'cannon':
+        return 0, 0, 15
+
+    # the bonus moves downward at a random angle, but is quite slow
+    if model == 'bonus':
+        return (0,) + rotate(1, 1, rng.randint(135, 315))  # 135~315: downward
+
+    # heavy sprite object falls down at a steeper angle, slow but hard to destroy (high hp)
+    if model in ('saturn', 'meteorite1', 'meteorite2'):
+        return (3,) + rotate(2, 2, rng.randint(205, 245))  # 205~245: steep
+
+    # enemy aircrafts make fast and aggressive moves, very dangerous, but vulnerable (low hp)
+    if model in ('ufo', 'missile'):
+        return 2, 0, -5
+
+    return 0, 0, 0  # the raider moves by hand
+
+
+def revive_velocity(rng):
+    """
+    Velocity of an enemy that dies and becomes a bonus, in any direction
+    Returns (vx, vy)
+    """
+    return rotate(2, 2, rng.randint(0, 360))
+
+
+def effects(model, exploded):
+    """
+    What happens to a sprite at every step besides moving
+    Returns (rotation in degrees, opacity lost, whether it bounces off the side walls)
+    """
+    if exploded:
+        return 0, 0.02, False  # every exploded sprite gradually fades away
+    if model in ('meteorite1', 'meteorite2'):
+        return 2, 0, False  # meteorites rotate while moving
+    return 0, 0, model == 'bonus'  # a bonus sprite bounces off left and right
+
+
+def cannon_position(x, y):
+    """
+    Where a cannon appears, above the nose of a raider at (x, y)
+    Returns (x, y)
+    """
+    return x + 154 / 3 - CANNON_SIZE[0] / 2, y + 224 / 2 + 30 - CANNON_SIZE[1] / 2
+
+
+def enemy_position(size, rng, width=WIDTH, height=HEIGHT):
+    """
+    Where a new enemy of some size enters, somewhere along the top edge
+    Returns (x, y)
+    """
+    return rng.randint(int(size[0] / 2), int(width - size[0] * 1.5)), height
+
+
+class Body:
+    """
+    A sprite of the headless world, a box with the state the rules need
+    """
+    __slots__ = ('model', 'x', 'y', 'width', 'height', 'vx', 'vy', 'hp', 'angle', 'opacity',
+                 'exploded', 'spin', 'fade', 'bounce')
+
+    def __init__(self, model, pos, size, rng):
+        self.model = model
+        self.x, self.y = pos
+        self.width, self.height = size
+        self.hp, self.vx, self.vy = launch(model, rng)
+        self.angle = 0
+        self.opacity = 1
+        self.exploded = False
+        self.spin, self.fade, self.bounce = effects(model, False)
+
+    def revive(self, rng):
+        self.model = 'bonus'
+        self.angle = 0
+        self.width, self.height = BONUS_SIZE
+        self.vx, self.vy = revive_velocity(rng)
+        self.spin, self.fade, self.bounce = effects(self.model, False)
+
+    def explode(self):
+        if self.model != 'bonus':
+            self.width, self.height = EXPLOSION_SIZE
+        self.angle = 0
+        self.vx = self.vy = 0
+        self.exploded = True
+        self.spin, self.fade, self.bounce = effects(self.model, True)
+
+
+class World:
+    """
+    One session of the game, advanced one fixed step at a time
+    """
+
+    def __init__(self, seed=None, width=WIDTH, height=HEIGHT):
+        self.seed = random.SystemRandom().getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.width = width
+        self.height = height
+        self.steps = 0
+        self.timer = 0
+        self.shield_time = 0
+        self.score = 0
+        self.raider = Body('raider', ((width - RAIDER_SIZE[0]) / 2, 0), RAIDER_SIZE, self.rng)
+        self.cannons = []
+        self.enemies = []  # meteorites, saturn, ufos and missiles...
+        self.bonus = []
+        self.explosions = []  # dead sprites fading away
+        self.grid = broadphase.SpatialHash(width, height)
+        self.peak = 0  # most sprites alive at once
+
+    def sprites(self):
+        return len(self.cannons) + len(self.enemies) + len(self.bonus) + len(self.explosions)
+
+    def fire(self):
+        pos = cannon_position(self.raider.x, self.raider.y)
+        self.cannons.append(Body('cannon', pos, CANNON_SIZE, self.rng))
+
+    def move_raider(self, center_x, center_y):
+        """
+        Put the center of the raider somewhere, kept inside the playfield
+        """
+        raider = self.raider
+        raider.x = min(max(center_x - raider.width / 2, 0), self.width - raider.width)
+        raider.y = min(max(center_y - raider.height / 2, 0), self.height - raider.height)
+
+    def apply(self, command, args):
+        if command == 'fire':
+            self.fire()
+        elif command == 'move':
+            self.move_raider(*args)
+        else:
+            assert command == 'end', "unknown input: " + command
+
+    def step(self):
+        """
+        Move every sprite, tick the timer and spawn enemies when due, then check boundaries
+        and collisions, as the screen does after every step
+        """
+        for group in (self.cannons, self.enemies, self.bonus, self.explosions):
+            for body in group:
+                if body.bounce and (body.x <= 0 or body.x >= self.width - body.width):
+                    body.vx *= -1
+                body.x += body.vx
+                body.y += body.vy
+                body.angle += body.spin
+                body.opacity -= body.fade
+        self.steps += 1
+
+        if self.steps % TICK_STEPS == 0:
+            self.timer += 1
+            self.shield_time += 1
+            if self.timer % SPAWN_TICKS == 0:
+                self.spawn_enemy()
+
+        self.collect()
+        self.peak = max(self.peak, self.sprites())
+
+    def spawn_enemy(self):
+        model = self.rng.choice(ENEMIES)
+        size = ENEMY_SIZES[model]
+        pos = enemy_position(size, self.rng, self.width, self.height)
+        self.enemies.append(Body(model, pos, size, self.rng))
+
+    def out_of_bound(self, body):
+        """
+        Check if a sprite has *completely* moved out of bound
+        Returns a boolean
+        """
+        return (body.x < -body.width or body.x > self.width or
+                body.y < -body.height or body.y > self.height)
+
+    def collect(self):
+        """
+        The rules of Space.garbage_collect: sprites out of bound leave, dead enemies explode
+        or revive as a bonus, cannons hit enemies and the raider catches bonuses
+        """
+        self.cannons = [body for body in self.cannons if not self.out_of_bound(body)]
+
+        targets = []  # enemies still alive after this pass
+        for body in self.enemies:
+            if self.out_of_bound(body):
+                continue
+            if body.hp <= 0:
+                if self.rng.random() > 0.9:
+                    body.revive(self.rng)
+                    self.bonus.append(body)
+                else:
+                    body.explode()
+                    self.explosions.append(body)
+            else:
+                targets.append(body)
+        self.enemies = targets
+
+        # a cannon is spent on the first enemy it hits, but an enemy can take several hits at once
+        spent = set()
+        for enemy, cannon in broadphase.collide_pairs(targets, self.cannons, self.grid):
+            if id(cannon) not in spent:
+                spent.add(id(cannon))
+                enemy.hp -= 1
+                self.score += 1
+        if spent:
+            self.cannons = [body for body in self.cannons if id(body) not in spent]
+
+        self.explosions = [body for body in self.explosions if body.opacity > 0]
+
+        flying = []
+        for body in self.bonus:
+            if body.y < -150 or body.y > self.height:  # bonus escapes the top or bottom
+                continue
+            if broadphase.overlap(body, self.raider):
+                body.explode()
+                self.explosions.append(body)
+                self.score += BONUS_SCORE  # bonus score
+                self.shield_time = SHIELD_TIME  # add protection shield
+            else:
+                flying.append(body)
+        self.bonus = flying
+
+
+class Recorder:
+    """
+    Write the input of a session to a replay file as it happens
+    """
+
+    def __init__(self, path, seed):
+        self._handle = open(path, 'w', buffering=1)  # line buffered, a crash loses nothing
+        self._handle.write('{} {} {}\n'.format(MAGIC, VERSION, seed))
+
+    def add(self, step, command, *args):
+        self._handle.write(' '.join([str(step), command] + [repr(float(arg)) for arg in args]) + '\n')
+
+    def close(self, step):
+        self.add(step, 'end')
+        self._handle.close()
+
+
+def read_replay(path):
+    """
+    Parse a replay file
+    Returns (seed, inputs) where inputs is a list of (step, command, args)
+    """
+    with open(path) as handle:
+        magic, version, seed = handle.readline().split()
+        assert magic == MAGIC, "not an asteroids replay: " + path
+        assert int(version) == VERSION, "unsupported asteroids replay version: " + version
+        inputs = []
+        for line in handle:
+            fields = line.split()
+            if fields:
+                inputs.append((int(fields[0]), fields[1], tuple(float(arg) for arg in fields[2:])))
+    return int(seed), inputs
+
+
+def play(world, inputs, steps=None):
+    """
+    Run a world through a list of inputs, up to a number of steps or the end of the inputs
+    Returns the world
+    """
+    if steps is None:
+        steps = max((step for step, command, args in inputs), default=0)
+    index = 0
+    while world.steps < steps:
+        while index < len(inputs) and inputs[index][0] <= world.steps:
+            step, command, args = inputs[index]
+            world.apply(command, args)
+            index += 1
+        world.step()
+    return world
+
+
+def script(steps, fire_every=6, sweep=4):
+    """
+    Scripted input: fire every few steps while the raider sweeps the bottom of the screen
+    Returns a list of (step, command, args)
+    """
+    inputs = []
+    half = RAIDER_SIZE[0] / 2
+    span = WIDTH - 2 * half
+    for step in range(steps):
+        if step % sweep == 0:
+            offset = (step // sweep * 5) % (2 * span)  # 5 px every sweep steps, back and forth
+            inputs.append((step, 'move', (half + min(offset, 2 * span - offset), RAIDER_SIZE[1] / 2)))
+        if fire_every and step % fire_every == 0:
+            inputs.append((step, 'fire', ()))
+    inputs.append((steps, 'end', ()))
+    return inputs
+
+
+def write_replay(path, seed, inputs):
+    recorder = Recorder(path, seed)
+    for step, command, args in inputs:
+        if command != 'end':
+            recorder.add(step, command, *args)
+    recorder.close(max((step for step, command, args in inputs), default=0))
+
+
+def run(world, inputs, profile=False):
+    """
+    Play a session, print how fast it went and, with profile, where the time was spent
+    Returns the world
+    """
+    profiler = cProfile.Profile() if profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    play(world, inputs)
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+    print("seed {}: {} steps ({:.0f} s of play) in {:.2f} s, {:.0f} steps/s".format(
+        world.seed, world.steps, world.steps * STEP, elapsed, world.steps / elapsed))
+    print("score {}, timer {}, at most {} sprites at once".format(world.score, world.timer, world.peak))
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    return world
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play asteroids without a window.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    scripted = commands.add_parser('run', help="play a scripted session")
+    scripted.add_argument('--seed', type=int, default=0)
+    scripted.add_argument('--steps', type=int, default=60 * 60, help="steps of 1/60 s")
+    scripted.add_argument('--fire-every', type=int, default=6, help="steps between two cannons")
+    scripted.add_argument('--output', default=None, help="write the scripted input as a replay file")
+    scripted.add_argument('--profile', action='store_true')
+    recorded = commands.add_parser('replay', help="play a recorded session again")
+    recorded.add_argument('replay')
+    recorded.add_argument('--profile', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        seed, inputs = args.seed, script(args.steps, args.fire_every)
+        if args.output:
+            write_replay(args.output, seed, inputs)
+    else:
+        seed, inputs = read_replay(args.replay)
+    run(World(seed), inputs, args.profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,29 +21,24 @@ OFFSETS = {UP: (1, 0),
 def merge(line):
     """
     Function that merges a single row or column in 2048.
+    One pass, the same algorithm as 2048/merge.py (codeskulptor cannot import it).
     """
-    
-    # slide zeros to the end of the list
-    slide_zero = [num for num in line if num != 0]
-    slide_zero.extend([0] * (len(line) - len(slide_zero)))
-    
-    # merge adjacent numbers
-    merged = [False] * len(slide_zero)
-    for curr_tile in range(len(slide_zero) - 1):
-        if slide_zero[curr_tile] == slide_zero[curr_tile + 1] \
-        and slide_zero[curr_tile] != 0 \
-        and not merged[curr_tile]:
-            slide_zero[curr_tile] *= 2
-            for next_tile in range(curr_tile + 1, len(slide_zero)):
-                try:
-                    slide_zero[next_tile] = slide_zero[next_tile + 1]
-                except:
-                    slide_zero[next_tile] = 0
-            merged[curr_tile] = True
-        else:
+    merged = []
+    waiting = 0  # the last tile kept, while it can still merge
+    for value in line:
+        if not value:
             continue
-
-    return slide_zero
+        if value == waiting:
+            merged.append(2 * value)
+            waiting = 0
+        else:
+            if waiting:
+                merged.append(waiting)
+            waiting = value
+    if waiting:
+        merged.append(waiting)
+    merged.extend([0] * (len(line) - len(merged)))
+    return merged
 
 class TwentyFortyEight:
     """